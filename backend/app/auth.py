@@ -1,3 +1,4 @@
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,9 +7,22 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .config import settings
 from .firebase_client import firebase_client
 from .models import TokenData, UserRole
+from .services.cache import TTLCache
 
 security = HTTPBearer()
 
+# Verified token -> claims, and uid -> User snapshot, so authenticated
+# requests skip the JWT decode and the user lookup while entries are fresh.
+# Changes made by query-level updates or by another worker only reach a
+# snapshot when it expires, so the user TTL is kept short and admins are
+# never cached: losing the admin role takes effect on the next request.
+_token_cache = TTLCache(settings.AUTH_TOKEN_CACHE_SECONDS, max_entries=10000)
+_user_cache = TTLCache(settings.AUTH_USER_CACHE_SECONDS, max_entries=10000)
+
+def invalidate_cached_user(uid: str) -> None:
+    """Drop a user's cached snapshot after a profile or role change in this process"""
+    _user_cache.pop(uid)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -20,8 +34,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
+    token_data = _token_cache.get(token)
+    if token_data is not None:
+        return token_data
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -41,18 +59,28 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     except JWTError:
         raise credentials_exception
     
-    # Token data is valid, return it
+    # Token data is valid; cache it, but never past the token's expiry
+    ttl = settings.AUTH_TOKEN_CACHE_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(token, token_data, ttl_seconds=ttl)
     return token_data
 
 async def get_current_user(token_data: TokenData = Depends(verify_token)):
     from .mongodb_models import User
-    user = await User.find_one(User.uid == token_data.uid)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    return user
+    user = _user_cache.get(token_data.uid)
+    if user is None:
+        user = await User.find_one(User.uid == token_data.uid)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        if user.role != UserRole.ADMIN:
+            _user_cache.set(token_data.uid, user)
+    # Hand out a copy so a request cannot change the cached snapshot
+    return user.copy()
 
 async def require_admin(current_user = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
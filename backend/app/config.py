@@ -11,6 +11,14 @@ class Settings:
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this")
     JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    AUTH_TOKEN_CACHE_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_SECONDS", "300"))
+    AUTH_USER_CACHE_SECONDS = int(os.getenv("AUTH_USER_CACHE_SECONDS", "10"))
+    
+    # Password Hashing (first scheme hashes new passwords, e.g. "argon2,bcrypt" with argon2-cffi installed)
+    PASSWORD_HASH_SCHEMES = os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt")
+    PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
     
     # MongoDB Configuration
     MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
@@ -19,6 +27,8 @@ class Settings:
     # Stripe Configuration
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
     STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
+    STRIPE_MAX_CONCURRENCY = int(os.getenv("STRIPE_MAX_CONCURRENCY", "10"))
+    STRIPE_TIMEOUT_SECONDS = int(os.getenv("STRIPE_TIMEOUT_SECONDS", "30"))
     
     # Flight API Configuration
     FLIGHT_API_USER_ID = os.getenv("FLIGHT_API_USER_ID")
@@ -26,6 +36,29 @@ class Settings:
     FLIGHT_API_ACCESS = os.getenv("FLIGHT_API_ACCESS", "Test")  # "Test" or "Production"
     FLIGHT_API_IP_ADDRESS = os.getenv("FLIGHT_API_IP_ADDRESS", "127.0.0.1")
     
+    # Hotel API Configuration
+    HOTEL_API_MAX_CONCURRENCY = int(os.getenv("HOTEL_API_MAX_CONCURRENCY", "10"))
+    HOTEL_SESSION_TTL_SECONDS = int(os.getenv("HOTEL_SESSION_TTL_SECONDS", "1800"))
+    HOTEL_CITIES_REFRESH_HOURS = int(os.getenv("HOTEL_CITIES_REFRESH_HOURS", "24"))
+    
+    # Logging
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
+    # Supplier API Logging
+    SUPPLIER_LOG_SAMPLE_RATE = float(os.getenv("SUPPLIER_LOG_SAMPLE_RATE", "0.1"))
+    SUPPLIER_LOG_BODY_LIMIT = int(os.getenv("SUPPLIER_LOG_BODY_LIMIT", "1000"))
+    
+    # Wallet Configuration
+    WALLET_SUMMARY_CACHE_SECONDS = int(os.getenv("WALLET_SUMMARY_CACHE_SECONDS", "5"))
+    REWARD_CATALOGUE_CACHE_SECONDS = int(os.getenv("REWARD_CATALOGUE_CACHE_SECONDS", "300"))
+    
+    # Background Event Processing
+    EVENT_QUEUE_WORKERS = int(os.getenv("EVENT_QUEUE_WORKERS", "2"))
+    EVENT_QUEUE_BATCH_SIZE = int(os.getenv("EVENT_QUEUE_BATCH_SIZE", "100"))
+    EVENT_QUEUE_POLL_SECONDS = float(os.getenv("EVENT_QUEUE_POLL_SECONDS", "5"))
+    EVENT_QUEUE_MAX_ATTEMPTS = int(os.getenv("EVENT_QUEUE_MAX_ATTEMPTS", "5"))
+    
     # CORS
     FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
     ADMIN_URL = os.getenv("ADMIN_URL", "http://localhost:3001")
@@ -1,3 +1,4 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -5,10 +6,16 @@ from beanie import init_beanie
 from .routers import auth_mongo, flights, hotels, packages, bookings, payments
 from .routes import franchise, referral, wallet
 from .config import settings
-from .mongodb_models import User, Flight, Hotel, VacationPackage, Booking, Payment
-from .models.franchise import FranchisePartner, FranchiseBooking, FranchiseCommission
-from .models.referral import ReferralCode, Referral, ReferralEarning, UserReferralStats
-from .models.wallet import Wallet, Transaction, PaymentMethod, RewardItem, RewardRedemption
+from .services.hotel_api import hotel_api_service
+from .services.hotel_cities import hotel_city_service
+from .services.franchise_analytics import franchise_analytics_service
+from .services.wallet_ledger import wallet_ledger_service
+from .services.event_queue import event_queue_service
+from .services.passwords import password_hasher
+from .payment import payment_service
+from .services.supplier_logging import start_supplier_logging, stop_supplier_logging
+from .mongodb_indexes import DOCUMENT_MODELS, ensure_unique_indexes, check_indexes
+from .pagination import NEXT_CURSOR_HEADER
 
 app = FastAPI(
     title="Flight Booking API",
@@ -23,24 +30,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 @app.on_event("startup")
 async def startup_event():
+    # Configure the root logger once; the supplier listener reuses its handlers
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    
+    # Write supplier API logs from a background thread
+    start_supplier_logging()
+    
     # Initialize MongoDB
     client = AsyncIOMotorClient(settings.MONGODB_URL)
     database = client[settings.MONGODB_DATABASE]
     
-    # Initialize Beanie with the document models
-    await init_beanie(
-        database=database,
-        document_models=[
-            User, Flight, Hotel, VacationPackage, Booking, Payment,
-            FranchisePartner, FranchiseBooking, FranchiseCommission,
-            ReferralCode, Referral, ReferralEarning, UserReferralStats,
-            Wallet, Transaction, PaymentMethod, RewardItem, RewardRedemption
-        ]
-    )
+    # Initialize Beanie with the document models (creates declared indexes)
+    await init_beanie(database=database, document_models=DOCUMENT_MODELS)
+    
+    # Merge duplicate per-user documents and build the unique indexes;
+    # conflicts that need a manual fix are logged rather than fatal
+    await ensure_unique_indexes()
+    
+    # Report any declared index that could not be created
+    await check_indexes()
+    
+    # Backfill franchise analytics rollups if they have never been built
+    await franchise_analytics_service.ensure_rollups()
+    
+    # Fill denormalized wallet summary fields on wallets that predate them
+    await wallet_ledger_service.backfill_summary_fields()
+    
+    # Load the hotel city catalogue and schedule its refresh
+    await hotel_city_service.start()
+    
+    # Start the referral and rewards event workers (resumes pending outbox events)
+    await event_queue_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await event_queue_service.stop()
+    await hotel_city_service.stop()
+    
+    # Release pooled supplier connections
+    await hotel_api_service.aclose()
+    
+    # Flush any queued supplier logs
+    stop_supplier_logging()
+    
+    password_hasher.shutdown()
+    payment_service.shutdown()
 
 # Include routers
 app.include_router(auth_mongo.router)
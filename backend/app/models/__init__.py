@@ -3,5 +3,6 @@ from ..flight_models import *
 
 # Import from submodules in this directory  
 from .franchise import *
+from .outbox import *
 from .referral import *
 from .wallet import *
\ No newline at end of file
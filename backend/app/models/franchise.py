@@ -1,9 +1,15 @@
-from beanie import Document
+import asyncio
+from beanie import Document, Insert, Replace, Save, Delete, before_event, after_event
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from typing import ClassVar, Optional, List
 from datetime import datetime
 from enum import Enum
 
+# How long a rollup rebuild may hold its lock, and how often waiting writers check it
+ROLLUP_REBUILD_LOCK_SECONDS = 300
+ROLLUP_REBUILD_POLL_SECONDS = 0.5
+
 class FranchiseStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
@@ -27,8 +33,21 @@ class FranchisePartner(Document):
     
     class Settings:
         name = "franchise_partners"
+        indexes = [
+            IndexModel([("registration_date", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("status", ASCENDING), ("registration_date", DESCENDING), ("_id", DESCENDING)]),
+        ]
 
 class FranchiseBooking(Document):
+    """
+    A booking made through a franchise partner
+
+    The event hooks keep franchise_daily_rollups current for document
+    writes (insert, save, replace, delete) and hold those writes while a
+    rollup rebuild runs. Query-level writes (insert_many, update_many,
+    set, delete_many) bypass the hooks: follow any of them with
+    ``franchise_analytics_service.rebuild_rollups()``.
+    """
     partner_id: str
     user_id: str
     booking_type: str  # flight, hotel, package
@@ -40,8 +59,99 @@ class FranchiseBooking(Document):
     travel_date: Optional[datetime] = None
     status: str = "confirmed"
     
+    @before_event(Insert, Replace, Save, Delete)
+    async def remove_from_rollups(self):
+        await FranchiseRollupLock.wait_for_rebuild()
+        if self.id is None:
+            return
+        previous = await FranchiseBooking.get_motor_collection().find_one(
+            {"_id": self.id}, FranchiseDailyRollup.SOURCE_FIELDS
+        )
+        if previous:
+            await FranchiseDailyRollup.apply(previous, -1)
+    
+    @after_event(Insert, Replace, Save)
+    async def add_to_rollups(self):
+        # A rebuild that started meanwhile reads this booking itself
+        if await FranchiseRollupLock.is_held():
+            return
+        await FranchiseDailyRollup.apply(self.dict(), 1)
+    
     class Settings:
         name = "franchise_bookings"
+        indexes = [
+            IndexModel([("booking_date", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("partner_id", ASCENDING), ("booking_date", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("status", ASCENDING), ("booking_date", DESCENDING), ("_id", DESCENDING)]),
+        ]
+
+class FranchiseDailyRollup(Document):
+    """Per-day franchise booking totals by partner, destination and booking type"""
+    date: datetime  # Midnight UTC of the booking day
+    partner_id: str
+    destination: str
+    booking_type: str
+    bookings: int = 0
+    revenue: float = 0.0
+    commission: float = 0.0
+    
+    # FranchiseBooking fields a rollup row is derived from
+    SOURCE_FIELDS: ClassVar[List[str]] = ["partner_id", "destination", "booking_type", "amount", "commission_amount", "booking_date"]
+    
+    @classmethod
+    async def apply(cls, booking: dict, sign: int):
+        """Add (sign=1) or remove (sign=-1) one booking from its daily rollup row"""
+        day = booking["booking_date"].replace(hour=0, minute=0, second=0, microsecond=0)
+        await cls.get_motor_collection().update_one(
+            {
+                "date": day,
+                "partner_id": booking["partner_id"],
+                "destination": booking["destination"],
+                "booking_type": booking["booking_type"]
+            },
+            {"$inc": {
+                "bookings": sign,
+                "revenue": sign * booking["amount"],
+                "commission": sign * booking["commission_amount"]
+            }},
+            upsert=True
+        )
+    
+    class Settings:
+        name = "franchise_daily_rollups"
+        indexes = [
+            IndexModel(
+                [("date", ASCENDING), ("partner_id", ASCENDING), ("destination", ASCENDING), ("booking_type", ASCENDING)],
+                unique=True
+            ),
+            IndexModel([("partner_id", ASCENDING), ("date", ASCENDING)]),
+        ]
+
+class FranchiseRollupLock(Document):
+    """Held by a rollup rebuild; franchise booking writes wait until it is released"""
+    name: str
+    locked_until: datetime
+    
+    REBUILD: ClassVar[str] = "franchise_daily_rollups"
+    
+    @classmethod
+    async def is_held(cls) -> bool:
+        lock = await cls.get_motor_collection().find_one(
+            {"name": cls.REBUILD, "locked_until": {"$gt": datetime.utcnow()}}, {"_id": 1}
+        )
+        return lock is not None
+    
+    @classmethod
+    async def wait_for_rebuild(cls):
+        """Wait until no rebuild holds the lock (or its lease runs out)"""
+        while await cls.is_held():
+            await asyncio.sleep(ROLLUP_REBUILD_POLL_SECONDS)
+    
+    class Settings:
+        name = "franchise_rollup_locks"
+        indexes = [
+            IndexModel([("name", ASCENDING)], unique=True),
+        ]
 
 class FranchiseCommission(Document):
     partner_id: str
@@ -54,6 +164,11 @@ class FranchiseCommission(Document):
     
     class Settings:
         name = "franchise_commissions"
+        indexes = [
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("partner_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("payment_status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ]
 
 class FranchiseStats(BaseModel):
     total_partners: int
@@ -62,4 +177,17 @@ class FranchiseStats(BaseModel):
     total_revenue: float
     monthly_growth: float
     top_destinations: List[dict]
-    recent_bookings: List[dict]
\ No newline at end of file
+    recent_bookings: List[dict]
+
+# One page of a franchise list; pass next_cursor back as cursor for the next page
+class FranchisePartnerPage(BaseModel):
+    partners: List[FranchisePartner]
+    next_cursor: Optional[str] = None
+
+class FranchiseBookingPage(BaseModel):
+    bookings: List[FranchiseBooking]
+    next_cursor: Optional[str] = None
+
+class FranchiseCommissionPage(BaseModel):
+    commissions: List[FranchiseCommission]
+    next_cursor: Optional[str] = None
\ No newline at end of file
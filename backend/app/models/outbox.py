@@ -0,0 +1,50 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+class OutboxEvent(Document):
+    event_type: str
+    payload: dict = Field(default_factory=dict)
+    idempotency_key: str
+    status: OutboxStatus = OutboxStatus.PENDING
+    attempts: int = 0
+    last_error: Optional[str] = None
+    available_at: datetime = Field(default_factory=datetime.utcnow)
+    lease: Optional[str] = None  # Worker claim token while processing
+    lease_expires_at: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "outbox_events"
+        indexes = [
+            IndexModel([("idempotency_key", ASCENDING)], unique=True),
+            IndexModel([("status", ASCENDING), ("available_at", ASCENDING)]),
+            # Only claimed events carry a lease token
+            IndexModel([("lease", ASCENDING)], partialFilterExpression={"lease": {"$type": "string"}}),
+        ]
+
+class AppliedEvent(Document):
+    """Marks an outbox event as applied to one target document"""
+    event_id: str
+    target: str  # "<collection>:<filter>" of the document the event updated
+    collection: str
+    filters: dict = Field(default_factory=dict)
+    released: bool = False  # Event ID pulled from the target's applied_events
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "applied_events"
+        indexes = [
+            IndexModel([("event_id", ASCENDING), ("target", ASCENDING)], unique=True),
+            IndexModel([("released", ASCENDING), ("created_at", ASCENDING)]),
+        ]
@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -27,6 +28,7 @@ class ReferralCode(Document):
     
     class Settings:
         name = "referral_codes"
+        # code and user_id are unique; see UNIQUE_INDEXES in mongodb_indexes
 
 class Referral(Document):
     referrer_id: str  # User who referred
@@ -42,6 +44,12 @@ class Referral(Document):
     
     class Settings:
         name = "referrals"
+        indexes = [
+            IndexModel([("referrer_id", ASCENDING), ("created_at", DESCENDING)]),
+            IndexModel([("referrer_id", ASCENDING), ("referred_email", ASCENDING)]),
+            IndexModel([("referral_code", ASCENDING), ("status", ASCENDING)]),
+            IndexModel([("referred_id", ASCENDING), ("status", ASCENDING)]),
+        ]
 
 class ReferralEarning(Document):
     user_id: str
@@ -50,10 +58,20 @@ class ReferralEarning(Document):
     type: str  # registration, booking, bonus
     status: str = "pending"  # pending, paid, cancelled
     payment_date: Optional[datetime] = None
+    event_id: Optional[str] = None  # Outbox event that recorded this earning
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Settings:
         name = "referral_earnings"
+        indexes = [
+            IndexModel(
+                [("event_id", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"event_id": {"$type": "string"}}
+            ),
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ]
 
 class UserReferralStats(Document):
     user_id: str = Field(unique=True)
@@ -63,10 +81,12 @@ class UserReferralStats(Document):
     pending_rewards: float = 0.0
     current_tier: ReferralTier = ReferralTier.BRONZE
     tier_points: int = 0
+    applied_events: List[str] = []  # Outbox events counted and not yet released
     last_updated: datetime = Field(default_factory=datetime.utcnow)
     
     class Settings:
         name = "user_referral_stats"
+        # user_id is unique; see UNIQUE_INDEXES in mongodb_indexes
 
 class ReferralReward(BaseModel):
     tier: ReferralTier
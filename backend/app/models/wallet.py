@@ -1,6 +1,7 @@
-from beanie import Document
+from beanie import Document, Insert, Replace, Save, SaveChanges, Update, Delete, after_event
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from typing import ClassVar, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -42,6 +43,9 @@ class PaymentMethod(Document):
     
     class Settings:
         name = "payment_methods"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("is_active", ASCENDING)]),
+        ]
 
 class Wallet(Document):
     user_id: str = Field(unique=True)
@@ -50,11 +54,16 @@ class Wallet(Document):
     total_cashback: float = 0.0
     membership_tier: MembershipTier = MembershipTier.BRONZE
     tier_points: int = 0
+    # Denormalized by the wallet ledger so GET /wallet/ needs no count query
+    transaction_count: int = 0
+    tier_progress: float = 0.0
+    applied_events: List[str] = []  # Outbox events credited and not yet released
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Settings:
         name = "wallets"
+        # user_id is unique; see UNIQUE_INDEXES in mongodb_indexes
 
 class Transaction(Document):
     user_id: str
@@ -67,11 +76,22 @@ class Transaction(Document):
     status: TransactionStatus = TransactionStatus.PENDING
     payment_method_id: Optional[str] = None
     metadata: Optional[dict] = {}
+    event_id: Optional[str] = None  # Outbox event that recorded this transaction
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
     
     class Settings:
         name = "transactions"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("type", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel([("reference_id", ASCENDING)]),
+            IndexModel(
+                [("event_id", ASCENDING), ("type", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"event_id": {"$type": "string"}}
+            ),
+        ]
 
 class RewardItem(Document):
     name: str
@@ -83,8 +103,18 @@ class RewardItem(Document):
     terms_conditions: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
+    # Bumped by every write through the model so cached catalogues reload
+    catalogue_version: ClassVar[int] = 0
+    
+    @after_event(Insert, Replace, Save, SaveChanges, Update, Delete)
+    def bump_catalogue_version(self):
+        RewardItem.catalogue_version += 1
+    
     class Settings:
         name = "reward_items"
+        indexes = [
+            IndexModel([("is_active", ASCENDING), ("points_required", ASCENDING)]),
+        ]
 
 class RewardRedemption(Document):
     user_id: str
@@ -96,6 +126,9 @@ class RewardRedemption(Document):
     
     class Settings:
         name = "reward_redemptions"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("redemption_date", DESCENDING)]),
+        ]
 
 class WalletStats(BaseModel):
     total_balance: float
@@ -1,10 +1,261 @@
+import asyncio
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from beanie import PydanticObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from .pagination import keyset_filter, keyset_sort, split_page
 from .mongodb_models import User, Flight, Hotel, VacationPackage, Booking, Payment, UserRole, BookingStatus, PaymentStatus
+from .models.outbox import AppliedEvent
+
+# Fields returned by the read-only listing endpoints (matching their response models)
+FLIGHT_LIST_FIELDS = [
+    "airline", "flight_number", "departure_airport", "arrival_airport", "departure_time",
+    "arrival_time", "price", "available_seats", "aircraft_type", "duration_minutes", "created_at"
+]
+BOOKING_LIST_FIELDS = [
+    "user_id", "booking_type", "item_id", "check_in_date", "check_out_date", "passengers",
+    "special_requests", "status", "total_amount", "created_at"
+]
+PAYMENT_LIST_FIELDS = [
+    "booking_id", "amount", "payment_method", "status", "stripe_payment_intent_id", "created_at"
+]
+
+async def get_or_create(
+    document_cls,
+    filters: Dict[str, Any],
+    defaults: Optional[Dict[str, Any]] = None,
+    update: Optional[Dict[str, Any]] = None,
+    session=None
+):
+    """
+    Atomically fetch the document matching ``filters``, creating it if missing
+    
+    One ``find_one_and_update`` with ``upsert`` and ``$setOnInsert`` of the
+    model defaults, so concurrent first requests cannot both insert. The
+    filter fields must be covered by a unique index.
+    
+    Args:
+        document_cls: Beanie document class
+        filters: Equality filter identifying the document, e.g. {"user_id": ...}
+        defaults: Values for required fields, written only on insert
+        update: Extra update operators (e.g. {"$inc": ...}) applied in the same call
+        session: Optional MongoDB session
+        
+    Returns:
+        The stored (or newly created) document
+    """
+    update = dict(update or {})
+    touched = {field for operator in update.values() for field in operator}
+    defaults = {
+        key: value
+        for key, value in document_cls(**filters, **(defaults or {})).dict(exclude={"id", "revision_id"}).items()
+        if key not in filters and key not in touched
+    }
+    if defaults:
+        update["$setOnInsert"] = defaults
+    
+    document = await document_cls.get_motor_collection().find_one_and_update(
+        filters,
+        update,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    return document_cls.parse_obj(document)
+
+_transactions_supported: Optional[bool] = None
+
+async def supports_transactions() -> bool:
+    """
+    Whether the connected deployment is a replica set or sharded cluster
+    """
+    global _transactions_supported
+    if _transactions_supported is None:
+        client = User.get_motor_collection().database.client
+        hello = await client.admin.command("hello")
+        _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
+async def run_in_transaction(callback):
+    """
+    Run ``callback(session)`` inside a multi-document transaction
+    
+    Standalone servers cannot run transactions, so there ``callback`` is
+    called with ``session=None`` and must order its writes to stay safe
+    without one.
+    
+    Returns:
+        Whatever ``callback`` returns
+    """
+    if not await supports_transactions():
+        return await callback(None)
+    
+    client = User.get_motor_collection().database.client
+    async with await client.start_session() as session:
+        return await session.with_transaction(callback)
+
+async def get_or_create_many(document_cls, filters: List[Dict[str, Any]], session=None) -> None:
+    """
+    Create whichever of the documents matching ``filters`` are missing, in one bulk upsert
+    
+    The bulk counterpart of ``get_or_create``; the filter fields must be
+    covered by a unique index.
+    """
+    if not filters:
+        return
+    operations = []
+    for item in filters:
+        defaults = {
+            key: value
+            for key, value in document_cls(**item).dict(exclude={"id", "revision_id"}).items()
+            if key not in item
+        }
+        operations.append(UpdateOne(item, {"$setOnInsert": defaults}, upsert=True))
+    await document_cls.get_motor_collection().bulk_write(operations, ordered=False, session=session)
+
+def _applied_target(collection_name: str, filters: Dict[str, Any]) -> str:
+    return f"{collection_name}:" + ",".join(f"{key}={filters[key]}" for key in sorted(filters))
+
+async def apply_once(
+    document_cls,
+    updates: List[Tuple[Dict[str, Any], str, Dict[str, Any]]],
+    session=None
+) -> int:
+    """
+    Apply each ``(filters, event_id, update)`` unless that event was already applied to that document
+    
+    Every applied event leaves an AppliedEvent marker, unique per event and
+    target document, which later attempts check first. Until the marker is
+    written, and for as long as the event may still be redelivered, the
+    event ID also sits in the document's ``applied_events``, guarding the
+    update itself: the increment and the ID land in one single-document
+    write, so a retry is a no-op even where transactions are unavailable.
+    ``release_applied_events`` pulls the IDs again once their events settle.
+    
+    All updates go out in one bulk write and the markers in one insert.
+    
+    Returns:
+        Number of updates that were not already marked as applied
+    """
+    if not updates:
+        return 0
+    collection = document_cls.get_motor_collection()
+    markers = AppliedEvent.get_motor_collection()
+    targets = [_applied_target(collection.name, filters) for filters, _, _ in updates]
+    
+    applied = {
+        (marker["event_id"], marker["target"])
+        for marker in await markers.find(
+            {"event_id": {"$in": list({event_id for _, event_id, _ in updates})}, "target": {"$in": targets}},
+            {"event_id": 1, "target": 1},
+            session=session
+        ).to_list(length=None)
+    }
+    pending = [
+        (target, filters, event_id, update)
+        for target, (filters, event_id, update) in zip(targets, updates)
+        if (event_id, target) not in applied
+    ]
+    if not pending:
+        return 0
+    
+    await collection.bulk_write([
+        UpdateOne(
+            {**filters, "applied_events": {"$ne": event_id}},
+            {**update, "$push": {"applied_events": event_id}}
+        )
+        for _, filters, event_id, update in pending
+    ], ordered=False, session=session)
+    await insert_once(AppliedEvent, [
+        AppliedEvent(event_id=event_id, target=target, collection=collection.name, filters=filters)
+        for target, filters, event_id, _ in pending
+    ], session=session)
+    return len(pending)
+
+async def release_applied_events(event_ids: List[str], session=None) -> int:
+    """
+    Pull settled events from their targets' ``applied_events``
+    
+    Only call this for events that can no longer be redelivered; their
+    AppliedEvent markers keep guarding them afterwards.
+    
+    Returns:
+        Number of markers released
+    """
+    markers = await AppliedEvent.get_motor_collection().find(
+        {"event_id": {"$in": event_ids}, "released": False},
+        {"event_id": 1, "collection": 1, "filters": 1},
+        session=session
+    ).to_list(length=None)
+    if not markers:
+        return 0
+    
+    database = AppliedEvent.get_motor_collection().database
+    by_collection: Dict[str, List[UpdateOne]] = {}
+    for marker in markers:
+        by_collection.setdefault(marker["collection"], []).append(
+            UpdateOne(marker["filters"], {"$pull": {"applied_events": marker["event_id"]}})
+        )
+    for collection_name, operations in by_collection.items():
+        await database[collection_name].bulk_write(operations, ordered=False, session=session)
+    
+    await AppliedEvent.get_motor_collection().update_many(
+        {"_id": {"$in": [marker["_id"] for marker in markers]}},
+        {"$set": {"released": True}},
+        session=session
+    )
+    return len(markers)
+
+async def insert_once(document_cls, documents: list, session=None) -> None:
+    """
+    Insert documents keyed by a unique index, skipping ones an earlier attempt already wrote
+    """
+    if not documents:
+        return
+    try:
+        await document_cls.insert_many(documents, session=session, ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+            raise
 
 class MongoDBService:
     
+    # Raw Read Operations
+    async def _find_raw(
+        self,
+        model,
+        filters: dict,
+        fields: Optional[List[str]] = None,
+        sort: Optional[List[tuple]] = None,
+        limit: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Read documents straight from the driver cursor, skipping model validation
+        
+        Args:
+            model: Beanie document class whose collection is queried
+            filters: MongoDB filter document
+            fields: Fields to project; all fields when omitted
+            sort: Sort specification as (field, direction) pairs
+            limit: Maximum number of documents (0 for no limit)
+            
+        Returns:
+            Plain dicts with ``_id`` replaced by a string ``id``
+        """
+        projection = {field: 1 for field in fields} if fields else None
+        cursor = model.get_motor_collection().find(filters, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        
+        result = []
+        async for document in cursor:
+            document["id"] = str(document.pop("_id"))
+            result.append(document)
+        return result
+    
     # User Operations
     async def create_user_profile(self, uid: str, email: str, full_name: str, phone: str = None, role: str = "user"):
         user = User(
@@ -49,20 +300,21 @@ class MongoDBService:
             return result
         return None
     
-    async def get_flights(self, filters: dict = None, limit: int = 50):
-        query = Flight.find()
-        
+    def _flight_query(self, filters: dict = None) -> dict:
+        query = {}
         if filters:
             if filters.get("departure_airport"):
-                query = query.find(Flight.departure_airport == filters["departure_airport"])
+                query["departure_airport"] = filters["departure_airport"]
             if filters.get("arrival_airport"):
-                query = query.find(Flight.arrival_airport == filters["arrival_airport"])
+                query["arrival_airport"] = filters["arrival_airport"]
             if filters.get("departure_date"):
                 start_date = datetime.fromisoformat(filters["departure_date"])
                 end_date = start_date.replace(hour=23, minute=59, second=59)
-                query = query.find(Flight.departure_time >= start_date, Flight.departure_time <= end_date)
-        
-        flights = await query.limit(limit).to_list()
+                query["departure_time"] = {"$gte": start_date, "$lte": end_date}
+        return query
+    
+    async def get_flights(self, filters: dict = None, limit: int = 50):
+        flights = await Flight.find(self._flight_query(filters)).limit(limit).to_list()
         result = []
         for flight in flights:
             flight_dict = flight.dict()
@@ -70,6 +322,9 @@ class MongoDBService:
             result.append(flight_dict)
         return result
     
+    async def list_flights(self, filters: dict = None, limit: int = 50, fields: List[str] = FLIGHT_LIST_FIELDS):
+        return await self._find_raw(Flight, self._flight_query(filters), fields, limit=limit)
+    
     async def update_flight(self, flight_id: str, update_data: dict):
         flight = await Flight.get(flight_id)
         if flight:
@@ -209,6 +464,45 @@ class MongoDBService:
             result.append(booking_dict)
         return result
     
+    async def list_user_bookings(self, user_id: str, fields: List[str] = BOOKING_LIST_FIELDS):
+        return await self._find_raw(Booking, {"user_id": user_id}, fields, sort=[("created_at", -1)])
+    
+    async def list_bookings(self, limit: int = 100, fields: List[str] = BOOKING_LIST_FIELDS):
+        return await self._find_raw(Booking, {}, fields, limit=limit)
+    
+    async def attach_item_details(self, bookings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add ``item_details`` to each booking with one ``$in`` query per booking type
+        
+        Args:
+            bookings: Booking dicts with ``booking_type`` and ``item_id``
+            
+        Returns:
+            The same bookings, with ``item_details`` set (None if the item is gone)
+        """
+        item_models = {"flight": Flight, "hotel": Hotel, "package": VacationPackage}
+        
+        ids_by_type: Dict[str, set] = {}
+        for booking in bookings:
+            if booking["booking_type"] in item_models and PydanticObjectId.is_valid(booking["item_id"]):
+                ids_by_type.setdefault(booking["booking_type"], set()).add(PydanticObjectId(booking["item_id"]))
+        
+        booking_types = list(ids_by_type)
+        results = await asyncio.gather(*(
+            self._find_raw(item_models[booking_type], {"_id": {"$in": list(ids_by_type[booking_type])}})
+            for booking_type in booking_types
+        ))
+        items = {
+            (booking_type, item["id"]): item
+            for booking_type, type_items in zip(booking_types, results)
+            for item in type_items
+        }
+        
+        for booking in bookings:
+            if booking["booking_type"] in item_models:
+                booking["item_details"] = items.get((booking["booking_type"], booking["item_id"]))
+        return bookings
+    
     async def update_booking(self, booking_id: str, update_data: dict):
         booking = await Booking.get(booking_id)
         if booking:
@@ -262,6 +556,70 @@ class MongoDBService:
             return result
         return None
     
+    async def get_payment_by_intent(self, payment_intent_id: str):
+        payment = await Payment.find_one(Payment.stripe_payment_intent_id == payment_intent_id)
+        if payment:
+            result = payment.dict()
+            result["id"] = str(payment.id)
+            return result
+        return None
+    
+    async def apply_payment_intent_outcomes(
+        self,
+        outcomes: Dict[str, PaymentStatus],
+        session=None
+    ) -> List[str]:
+        """
+        Bulk-apply final statuses for Stripe payment intents and confirm paid bookings
+        
+        A payment moves to completed from pending or failed, and to failed only
+        from pending. One read fetches the affected payments, one bulk write
+        updates them and one update confirms their bookings.
+        
+        Args:
+            outcomes: Final status per payment intent ID (completed or failed)
+            session: Optional MongoDB session
+            
+        Returns:
+            Payment intent IDs with no matching payment
+        """
+        allowed_from = {
+            PaymentStatus.COMPLETED: [PaymentStatus.PENDING.value, PaymentStatus.FAILED.value],
+            PaymentStatus.FAILED: [PaymentStatus.PENDING.value]
+        }
+        collection = Payment.get_motor_collection()
+        payments = await collection.find(
+            # $type matches the partial unique index on the intent ID
+            {"stripe_payment_intent_id": {"$in": list(outcomes), "$type": "string"}},
+            {"stripe_payment_intent_id": 1, "status": 1, "booking_id": 1},
+            session=session
+        ).to_list(length=None)
+        
+        updates, paid_bookings = [], []
+        for payment in payments:
+            status = outcomes[payment["stripe_payment_intent_id"]]
+            if payment["status"] not in allowed_from[status]:
+                continue
+            # Matching the status read above keeps a concurrent change from being overwritten
+            updates.append(UpdateOne(
+                {"_id": payment["_id"], "status": payment["status"]},
+                {"$set": {"status": status.value}}
+            ))
+            if status == PaymentStatus.COMPLETED:
+                paid_bookings.append(PydanticObjectId(payment["booking_id"]))
+        
+        if updates:
+            await collection.bulk_write(updates, ordered=False, session=session)
+        if paid_bookings:
+            await Booking.get_motor_collection().update_many(
+                {"_id": {"$in": paid_bookings}},
+                {"$set": {"status": BookingStatus.CONFIRMED.value}},
+                session=session
+            )
+        
+        found = {payment["stripe_payment_intent_id"] for payment in payments}
+        return [intent_id for intent_id in outcomes if intent_id not in found]
+    
     async def get_all_payments(self, limit: int = 100):
         payments = await Payment.find().limit(limit).to_list()
         result = []
@@ -270,5 +628,53 @@ class MongoDBService:
             payment_dict["id"] = str(payment.id)
             result.append(payment_dict)
         return result
+    
+    async def list_payments(self, limit: int = 100, fields: List[str] = PAYMENT_LIST_FIELDS):
+        return await self._find_raw(Payment, {}, fields, limit=limit)
+    
+    async def list_user_payments(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: List[str] = PAYMENT_LIST_FIELDS
+    ):
+        """
+        Get a page of a user's payments, newest first, in one aggregation
+        
+        The user's bookings are joined to their payments on the indexed
+        ``payments.booking_id`` field, so the cost does not depend on how
+        many bookings the user has.
+        
+        Args:
+            user_id: Owner of the bookings
+            limit: Page size
+            cursor: Cursor returned with the previous page
+            fields: Payment fields to return
+            
+        Returns:
+            Tuple of (payments, next_cursor); next_cursor is None on the last page
+        """
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$project": {"booking_id": {"$toString": "$_id"}}},
+            {"$lookup": {
+                "from": Payment.get_motor_collection().name,
+                "localField": "booking_id",
+                "foreignField": "booking_id",
+                "as": "payment"
+            }},
+            {"$unwind": "$payment"},
+            {"$replaceRoot": {"newRoot": "$payment"}},
+            {"$match": keyset_filter("created_at", cursor)},
+            {"$sort": dict(keyset_sort("created_at"))},
+            {"$limit": limit + 1},
+            {"$project": {field: 1 for field in fields}}
+        ]
+        rows = await Booking.get_motor_collection().aggregate(pipeline).to_list(length=None)
+        payments, next_cursor = split_page(rows, limit, "created_at")
+        for payment in payments:
+            payment["id"] = str(payment.pop("_id"))
+        return payments, next_cursor
 
 db_service = MongoDBService()
\ No newline at end of file
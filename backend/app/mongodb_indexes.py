@@ -0,0 +1,209 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Type
+from beanie import Document
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import OperationFailure
+from .mongodb_models import User, Flight, Hotel, VacationPackage, Booking, Payment, HotelCity
+from .models.franchise import (
+    FranchisePartner, FranchiseBooking, FranchiseCommission, FranchiseDailyRollup, FranchiseRollupLock
+)
+from .models.referral import ReferralCode, Referral, ReferralEarning, UserReferralStats, ReferralTier
+from .models.wallet import Wallet, Transaction, PaymentMethod, RewardItem, RewardRedemption, MembershipTier
+from .models.outbox import OutboxEvent, AppliedEvent
+from .services.wallet_ledger import TIER_ORDER, tier_for_points, tier_progress
+
+logger = logging.getLogger(__name__)
+
+# Every document registered with init_beanie
+DOCUMENT_MODELS: List[Type[Document]] = [
+    User, Flight, Hotel, VacationPackage, Booking, Payment, HotelCity,
+    FranchisePartner, FranchiseBooking, FranchiseCommission, FranchiseDailyRollup, FranchiseRollupLock,
+    ReferralCode, Referral, ReferralEarning, UserReferralStats,
+    Wallet, Transaction, PaymentMethod, RewardItem, RewardRedemption,
+    OutboxEvent, AppliedEvent
+]
+
+# Unique indexes on collections that held data before the index existed.
+# They are kept out of Settings.indexes so a duplicate key cannot abort
+# init_beanie; ensure_unique_indexes builds them after merging what it can.
+UNIQUE_INDEXES: Dict[Type[Document], List[IndexModel]] = {
+    User: [
+        IndexModel([("uid", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    Payment: [
+        IndexModel(
+            [("stripe_payment_intent_id", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"stripe_payment_intent_id": {"$type": "string"}}
+        ),
+    ],
+    ReferralCode: [
+        IndexModel([("code", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    UserReferralStats: [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    Wallet: [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+}
+
+REFERRAL_TIER_ORDER = [ReferralTier.BRONZE, ReferralTier.SILVER, ReferralTier.GOLD, ReferralTier.PLATINUM]
+
+
+def _declared_indexes(model: Type[Document]) -> List[tuple]:
+    """
+    Key specs declared in a document's Settings.indexes and UNIQUE_INDEXES
+    """
+    declared = []
+    for index in list(getattr(model.Settings, "indexes", [])) + UNIQUE_INDEXES.get(model, []):
+        declared.append(tuple((field, direction) for field, direction in index.document["key"].items()))
+    return declared
+
+
+async def find_duplicates(model: Type[Document], index: IndexModel) -> List[Dict[str, Any]]:
+    """
+    Groups of documents that would violate a unique index
+
+    Returns:
+        One dict per duplicated key, with the key values and the ``_id`` of
+        each document holding it (oldest first)
+    """
+    keys = list(index.document["key"])
+    return await model.get_motor_collection().aggregate([
+        {"$match": index.document.get("partialFilterExpression", {})},
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {field: f"${field}" for field in keys},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]).to_list(length=None)
+
+
+async def _fold_counters(
+    model: Type[Document],
+    ids: List[Any],
+    counters: List[str]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Add the counters of every duplicate onto the oldest one and delete the rest
+
+    Returns:
+        Tuple of (surviving raw document with the summed counters, deleted documents)
+    """
+    collection = model.get_motor_collection()
+    documents = await collection.find({"_id": {"$in": ids}}).sort("_id", 1).to_list(length=None)
+    kept, extra = documents[0], documents[1:]
+    increments = {field: sum(document.get(field, 0) for document in extra) for field in counters}
+    await collection.update_one({"_id": kept["_id"]}, {"$inc": increments})
+    await collection.delete_many({"_id": {"$in": [document["_id"] for document in extra]}})
+    return {**kept, **{field: kept.get(field, 0) + increments[field] for field in counters}}, extra
+
+
+async def _merge_wallets(ids: List[Any]) -> None:
+    wallet, merged = await _fold_counters(
+        Wallet, ids, ["balance", "points", "total_cashback", "tier_points", "transaction_count"]
+    )
+    tiers = [MembershipTier(document["membership_tier"]) for document in [wallet, *merged]]
+    tier = max([tier_for_points(wallet["tier_points"]), *tiers], key=TIER_ORDER.index)
+    await Wallet.get_motor_collection().update_one(
+        {"_id": wallet["_id"]},
+        {"$set": {"membership_tier": tier.value, "tier_progress": tier_progress(tier, wallet["tier_points"])}}
+    )
+    # Point the merged wallets' history at the surviving wallet
+    await Transaction.get_motor_collection().update_many(
+        {"wallet_id": {"$in": [str(document["_id"]) for document in merged]}},
+        {"$set": {"wallet_id": str(wallet["_id"])}}
+    )
+
+
+async def _merge_referral_stats(ids: List[Any]) -> None:
+    stats, merged = await _fold_counters(
+        UserReferralStats, ids,
+        ["total_referrals", "successful_bookings", "total_earnings", "pending_rewards", "tier_points"]
+    )
+    tier = max(
+        (ReferralTier(document["current_tier"]) for document in [stats, *merged]),
+        key=REFERRAL_TIER_ORDER.index
+    )
+    await UserReferralStats.get_motor_collection().update_one(
+        {"_id": stats["_id"]}, {"$set": {"current_tier": tier.value}}
+    )
+
+
+# Per-user counter documents that concurrent first requests could create
+# twice; their duplicates are merged. Others (users, referral codes,
+# payments) need a manual decision and are only reported.
+DUPLICATE_MERGES: Dict[Type[Document], Callable[[List[Any]], Awaitable[None]]] = {
+    Wallet: _merge_wallets,
+    UserReferralStats: _merge_referral_stats,
+}
+
+
+async def ensure_unique_indexes(indexes: Dict[Type[Document], List[IndexModel]] = UNIQUE_INDEXES) -> bool:
+    """
+    Merge mergeable duplicates, then create each unique index
+
+    A failure is logged with the conflicting keys and leaves that index
+    missing (and reported by check_indexes) instead of stopping startup.
+
+    Returns:
+        Whether every unique index exists
+    """
+    created = True
+    for model, model_indexes in indexes.items():
+        collection = model.get_motor_collection()
+        for index in model_indexes:
+            keys = list(index.document["key"])
+            merge = DUPLICATE_MERGES.get(model)
+            if merge is not None:
+                for group in await find_duplicates(model, index):
+                    logger.warning(f"Merging {group['count']} duplicate {collection.name} documents for {group['_id']}")
+                    await merge(group["ids"])
+
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                created = False
+                logger.error(f"Could not create unique index on {collection.name} {keys}: {str(e)}")
+                for group in await find_duplicates(model, index):
+                    logger.error(f"Duplicate {collection.name} {group['_id']}: {group['ids']}")
+    return created
+
+
+async def find_missing_indexes(models: List[Type[Document]] = DOCUMENT_MODELS) -> Dict[str, List[tuple]]:
+    """
+    Compare declared indexes with the ones present in MongoDB
+
+    Returns:
+        Mapping of collection name to the declared key specs it is missing
+    """
+    missing = {}
+    for model in models:
+        collection = model.get_motor_collection()
+        existing = {
+            tuple((field, direction) for field, direction in info["key"])
+            for info in (await collection.index_information()).values()
+        }
+        absent = [keys for keys in _declared_indexes(model) if keys not in existing]
+        if absent:
+            missing[collection.name] = absent
+    return missing
+
+
+async def check_indexes(models: List[Type[Document]] = DOCUMENT_MODELS) -> bool:
+    """
+    Log any declared index that init_beanie or ensure_unique_indexes failed to create
+    """
+    missing = await find_missing_indexes(models)
+    for collection_name, keys in missing.items():
+        for key in keys:
+            logger.warning(f"Missing MongoDB index on {collection_name}: {list(key)}")
+
+    if not missing:
+        logger.info("All declared MongoDB indexes are present")
+    return not missing
@@ -1,5 +1,6 @@
-from beanie import Document, PydanticObjectId
+from beanie import Document, PydanticObjectId, Replace, Save, SaveChanges, Update, Delete, after_event
 from pydantic import BaseModel, EmailStr, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -30,8 +31,14 @@ class User(Document):
     role: UserRole = UserRole.USER
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_cached_user(self):
+        from .auth import invalidate_cached_user
+        invalidate_cached_user(self.uid)
+    
     class Settings:
         name = "users"
+        # uid and email are unique; see UNIQUE_INDEXES in mongodb_indexes
 
 class Flight(Document):
     airline: str
@@ -48,6 +55,9 @@ class Flight(Document):
     
     class Settings:
         name = "flights"
+        indexes = [
+            IndexModel([("departure_airport", ASCENDING), ("arrival_airport", ASCENDING), ("departure_time", ASCENDING)]),
+        ]
 
 class Hotel(Document):
     name: str
@@ -63,6 +73,9 @@ class Hotel(Document):
     
     class Settings:
         name = "hotels"
+        indexes = [
+            IndexModel([("location", ASCENDING)]),
+        ]
 
 class VacationPackage(Document):
     name: str
@@ -78,6 +91,9 @@ class VacationPackage(Document):
     
     class Settings:
         name = "vacation_packages"
+        indexes = [
+            IndexModel([("destination", ASCENDING)]),
+        ]
 
 class Booking(Document):
     user_id: str
@@ -93,6 +109,9 @@ class Booking(Document):
     
     class Settings:
         name = "bookings"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        ]
 
 class Payment(Document):
     booking_id: str
@@ -103,4 +122,18 @@ class Payment(Document):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Settings:
-        name = "payments"
\ No newline at end of file
+        name = "payments"
+        indexes = [
+            IndexModel([("booking_id", ASCENDING)]),
+        ]
+
+class HotelCity(Document):
+    city_name: str
+    country_name: str = ""
+    city_code: str = ""
+    country_code: str = ""
+    position: int = 0  # Order in the supplier's city list
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "hotel_cities"
@@ -0,0 +1,90 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from beanie import PydanticObjectId
+
+# Response header carrying the next page cursor for endpoints that return a bare list
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, document_id: Any) -> str:
+    """
+    Build an opaque cursor from the last row of a page
+    """
+    raw = json.dumps({"v": sort_value.isoformat(), "id": str(document_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, PydanticObjectId]:
+    """
+    Parse a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["v"]), PydanticObjectId(data["id"])
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def keyset_filter(sort_field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Filter for the rows after ``cursor`` in (sort_field desc, _id desc) order
+    """
+    if not cursor:
+        return {}
+    sort_value, document_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "_id": {"$lt": document_id}}
+        ]
+    }
+
+
+def keyset_sort(sort_field: str) -> List[Tuple[str, int]]:
+    return [(sort_field, -1), ("_id", -1)]
+
+
+def split_page(rows: List[Any], limit: int, sort_field: str) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim a ``limit + 1`` row fetch to one page and derive its next cursor
+
+    Rows may be documents or raw dicts (with ``_id`` or ``id``).
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    last = page[-1]
+    if isinstance(last, dict):
+        return page, encode_cursor(last[sort_field], last.get("_id", last.get("id")))
+    return page, encode_cursor(getattr(last, sort_field), last.id)
+
+
+async def fetch_page(query, sort_field: str, limit: int, cursor: Optional[str] = None, offset: int = 0):
+    """
+    Run a Beanie find query for one page in (sort_field desc, _id desc) order
+
+    ``cursor`` takes precedence; ``offset`` is kept for older clients.
+
+    Returns:
+        Tuple of (documents, next_cursor)
+    
+    Raises:
+        ValueError: If ``limit`` is below 1 or the cursor is malformed
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    if cursor:
+        query = query.find(keyset_filter(sort_field, cursor))
+    query = query.sort(keyset_sort(sort_field))
+    if offset and not cursor:
+        query = query.skip(offset)
+
+    rows = await query.limit(limit + 1).to_list()
+    return split_page(rows, limit, sort_field)
@@ -1,18 +1,47 @@
+import asyncio
+import functools
+import logging
 import stripe
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
 from .config import settings
 from .mongodb_database import db_service
 from .models import PaymentStatus
+from .services.event_queue import event_queue_service
+
+logger = logging.getLogger(__name__)
+
+# Outbox event type for stored Stripe webhook events
+STRIPE_WEBHOOK_EVENT = "stripe.payment_intent"
+
+# Stripe webhook event types we act on, and the payment status each leads to
+WEBHOOK_OUTCOMES = {
+    "payment_intent.succeeded": PaymentStatus.COMPLETED,
+    "payment_intent.payment_failed": PaymentStatus.FAILED
+}
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
+# The requests client keeps one keep-alive session per thread, so each
+# executor thread below reuses its connection to Stripe
+stripe.default_http_client = stripe.http_client.RequestsClient(timeout=settings.STRIPE_TIMEOUT_SECONDS)
 
 class PaymentService:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = settings.STRIPE_MAX_CONCURRENCY):
         self.stripe = stripe
+        # The Stripe SDK is blocking; its calls run here instead of on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="stripe")
+    
+    async def _call_stripe(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+    
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
     
     async def create_payment_intent(self, amount: float, currency: str = "usd", metadata: Dict[str, Any] = None):
         try:
-            intent = self.stripe.PaymentIntent.create(
+            intent = await self._call_stripe(
+                self.stripe.PaymentIntent.create,
                 amount=int(amount * 100),  # Stripe expects amount in cents
                 currency=currency,
                 metadata=metadata or {}
@@ -23,7 +52,7 @@ class PaymentService:
     
     async def confirm_payment_intent(self, payment_intent_id: str):
         try:
-            intent = self.stripe.PaymentIntent.retrieve(payment_intent_id)
+            intent = await self._call_stripe(self.stripe.PaymentIntent.retrieve, payment_intent_id)
             return intent
         except stripe.error.StripeError as e:
             raise Exception(f"Stripe error: {str(e)}")
@@ -53,42 +82,48 @@ class PaymentService:
         payment_id = await db_service.create_payment(payment_data)
         return await db_service.get_payment(payment_id)
     
-    async def handle_payment_success(self, payment_intent_id: str):
-        # Find payment by Stripe payment intent ID
-        payments = await db_service.get_all_payments()
-        payment = None
-        for p in payments:
-            if p.get("stripe_payment_intent_id") == payment_intent_id:
-                payment = p
-                break
-        
-        if not payment:
+    async def _apply_outcome(self, payment_intent_id: str, status: PaymentStatus):
+        # Same status-guarded update as stored webhook events, so a confirm
+        # racing its webhook cannot apply the transition twice
+        missing = await db_service.apply_payment_intent_outcomes({payment_intent_id: status})
+        if missing:
             raise Exception("Payment not found")
-        
-        # Update payment status
-        await db_service.update_payment(payment["id"], {"status": PaymentStatus.COMPLETED})
-        
-        # Update booking status
-        await db_service.update_booking(payment["booking_id"], {"status": "confirmed"})
-        
-        return payment
+        return await db_service.get_payment_by_intent(payment_intent_id)
+    
+    async def handle_payment_success(self, payment_intent_id: str):
+        # Completes a pending or failed payment and confirms its booking
+        return await self._apply_outcome(payment_intent_id, PaymentStatus.COMPLETED)
     
     async def handle_payment_failure(self, payment_intent_id: str):
-        # Find payment by Stripe payment intent ID
-        payments = await db_service.get_all_payments()
-        payment = None
-        for p in payments:
-            if p.get("stripe_payment_intent_id") == payment_intent_id:
-                payment = p
-                break
+        # Only a pending payment can fail; later events must not undo a success
+        return await self._apply_outcome(payment_intent_id, PaymentStatus.FAILED)
+    
+    async def apply_webhook_events(self, events: List[Dict[str, Any]], session=None):
+        """
+        Apply a batch of stored Stripe webhook events
         
-        if not payment:
-            raise Exception("Payment not found")
+        Events are folded per payment intent in Stripe's ``created`` order and
+        written with one bulk update. A success is final and a failure only
+        fails a pending payment, so the result does not depend on how events
+        were split across batches or redelivered.
         
-        # Update payment status
-        await db_service.update_payment(payment["id"], {"status": PaymentStatus.FAILED})
+        Raises:
+            Exception: If a payment intent has no Payment yet
+        """
+        outcomes: Dict[str, PaymentStatus] = {}
+        for event in sorted((event["payload"] for event in events), key=lambda event: event.get("created", 0)):
+            intent_id = event["data"]["object"]["id"]
+            if outcomes.get(intent_id) != PaymentStatus.COMPLETED:
+                outcomes[intent_id] = WEBHOOK_OUTCOMES[event["type"]]
         
-        return payment
+        missing = await db_service.apply_payment_intent_outcomes(outcomes, session=session)
+        if missing:
+            # The webhook can beat the Payment insert; failing hands these
+            # events back to the queue, which retries them with backoff
+            # (the batch is retried per event, and the guarded updates make
+            # the known intents no-ops the second time)
+            logger.warning(f"Stripe webhook for unknown payment intents {missing}, retrying later")
+            raise Exception(f"Payment not found for {', '.join(missing)}")
     
     async def refund_payment(self, payment_id: str, amount: float = None):
         payment = await db_service.get_payment(payment_id)
@@ -97,7 +132,8 @@ class PaymentService:
         
         if payment["payment_method"] == "stripe" and payment.get("stripe_payment_intent_id"):
             try:
-                refund = self.stripe.Refund.create(
+                refund = await self._call_stripe(
+                    self.stripe.Refund.create,
                     payment_intent=payment["stripe_payment_intent_id"],
                     amount=int((amount or payment["amount"]) * 100)
                 )
@@ -111,4 +147,7 @@ class PaymentService:
         
         raise Exception("Refund not supported for this payment method")
 
-payment_service = PaymentService()
\ No newline at end of file
+payment_service = PaymentService()
+
+# Stored webhook events are applied by the background event workers
+event_queue_service.handler(STRIPE_WEBHOOK_EVENT)(payment_service.apply_webhook_events)
\ No newline at end of file
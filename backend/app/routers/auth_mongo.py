@@ -1,30 +1,22 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import HTTPBearer
 from datetime import timedelta
-import hashlib
-import secrets
 import uuid
 from ..models import UserCreate, UserLogin, UserResponse, Token, TokenData
 from ..auth import create_access_token, get_current_user
 from ..mongodb_models import User
 from ..config import settings
+from ..services.passwords import password_hasher, PasswordHasherBusyError
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256 with salt"""
-    salt = secrets.token_hex(32)
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return f"{salt}:{password_hash}"
-
-def verify_password(password: str, password_hash: str) -> bool:
-    """Verify password against hash"""
-    try:
-        salt, hash_part = password_hash.split(':')
-        return hashlib.sha256((password + salt).encode()).hexdigest() == hash_part
-    except:
-        return False
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
 
 @router.post("/register", response_model=dict)
 async def register(user_data: UserCreate):
@@ -40,8 +32,11 @@ async def register(user_data: UserCreate):
         # Generate unique user ID
         user_uid = str(uuid.uuid4())
         
-        # Hash password
-        password_hash = hash_password(user_data.password)
+        # Hash password (in the hashing thread pool)
+        try:
+            password_hash = await password_hasher.hash(user_data.password)
+        except PasswordHasherBusyError:
+            raise _hashing_busy()
         
         # Create user in MongoDB
         user = User(
@@ -94,13 +89,23 @@ async def login(user_credentials: UserLogin):
                 detail="Invalid email or password"
             )
         
-        # Verify password
-        if not user.password_hash or not verify_password(user_credentials.password, user.password_hash):
+        # Verify password (in the hashing thread pool)
+        valid, new_hash = False, None
+        if user.password_hash:
+            try:
+                valid, new_hash = await password_hasher.verify(user_credentials.password, user.password_hash)
+            except PasswordHasherBusyError:
+                raise _hashing_busy()
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
         
+        # Upgrade legacy or outdated hashes now that we have the plain password
+        if new_hash:
+            await user.set({User.password_hash: new_hash})
+        
         # Create access token
         access_token_expires = timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
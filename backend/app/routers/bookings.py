@@ -65,21 +65,10 @@ async def create_booking(
 @router.get("/my-bookings", response_model=List[BookingResponse])
 async def get_my_bookings(current_user: TokenData = Depends(get_current_user)):
     try:
-        bookings = await db_service.get_user_bookings(current_user.uid)
+        bookings = await db_service.list_user_bookings(current_user.uid)
         
-        # Add item details to each booking
-        for booking in bookings:
-            if booking["booking_type"] == "flight":
-                flight = await db_service.get_flight(booking["item_id"])
-                booking["item_details"] = flight
-            elif booking["booking_type"] == "hotel":
-                hotel = await db_service.get_hotel(booking["item_id"])
-                booking["item_details"] = hotel
-            elif booking["booking_type"] == "package":
-                package = await db_service.get_vacation_package(booking["item_id"])
-                booking["item_details"] = package
-        
-        return bookings
+        # Add item details with one batched lookup per booking type
+        return await db_service.attach_item_details(bookings)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -121,21 +110,10 @@ async def get_booking(
 @router.get("/", response_model=List[BookingResponse])
 async def get_all_bookings(current_user = Depends(require_admin)):
     try:
-        bookings = await db_service.get_all_bookings()
-        
-        # Add item details to each booking
-        for booking in bookings:
-            if booking["booking_type"] == "flight":
-                flight = await db_service.get_flight(booking["item_id"])
-                booking["item_details"] = flight
-            elif booking["booking_type"] == "hotel":
-                hotel = await db_service.get_hotel(booking["item_id"])
-                booking["item_details"] = hotel
-            elif booking["booking_type"] == "package":
-                package = await db_service.get_vacation_package(booking["item_id"])
-                booking["item_details"] = package
+        bookings = await db_service.list_bookings()
         
-        return bookings
+        # Add item details with one batched lookup per booking type
+        return await db_service.attach_item_details(bookings)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -868,7 +868,7 @@ async def get_airlines():
 
 @router.get("/", response_model=List[FlightResponse])
 async def get_all_flights(limit: Optional[int] = Query(50)):
-    flights = await db_service.get_flights(limit=limit)
+    flights = await db_service.list_flights(limit=limit)
     return flights
 
 @router.get("/{flight_id}", response_model=FlightResponse)
@@ -1,12 +1,32 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query, Body
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from ..models import HotelCreate, HotelUpdate, HotelResponse, HotelSearch
 from ..auth import get_current_user, require_admin
 from ..mongodb_database import db_service
-from ..services.hotel_api import hotel_api_service
+from ..services.hotel_api import hotel_api_service, HOTEL_RESULT_FIELDS
+from ..services.hotel_cities import hotel_city_service
 
 router = APIRouter(prefix="/hotels", tags=["hotels"])
 
+FIELDS_DESCRIPTION = (
+    "Comma-separated hotel fields to return (e.g. 'hotel_name,pricing,media'). "
+    "hotel_id is always included; all fields are returned when omitted."
+)
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Parse and validate the sparse fieldset query parameter"""
+    if not fields:
+        return None
+    
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(HOTEL_RESULT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed fields: {', '.join(HOTEL_RESULT_FIELDS)}"
+        )
+    return requested
+
 @router.get("/search")
 async def search_hotels(
     check_in_date: str = Query(..., description="Check-in date (YYYY-MM-DD)"),
@@ -24,7 +44,8 @@ async def search_hotels(
     radius: int = Query(20, description="Search radius in KM"),
     max_result: int = Query(25, description="Maximum number of results"),
     results_per_page: Optional[int] = Query(None, description="Results per page for pagination"),
-    child_ages: Optional[str] = Query(None, description="Comma-separated child ages (if children > 0)")
+    child_ages: Optional[str] = Query(None, description="Comma-separated child ages (if children > 0)"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Search for hotel availability using TravelNext Hotel API v6
@@ -35,6 +56,8 @@ async def search_hotels(
     - Hotel-specific search: Provide hotel_codes
     """
     try:
+        selected_fields = parse_fields(fields)
+        
         # Parse child ages if provided
         parsed_child_ages = []
         if child_ages and children > 0:
@@ -90,7 +113,8 @@ async def search_hotels(
             hotel_codes=parsed_hotel_codes,
             radius=radius,
             max_result=max_result,
-            results_per_page=results_per_page
+            results_per_page=results_per_page,
+            fields=selected_fields
         )
         
         if not result["success"]:
@@ -143,7 +167,8 @@ async def search_hotels(
 async def get_more_hotel_results(
     session_id: str = Query(..., description="Session ID from previous hotel search"),
     next_token: str = Query(..., description="Next token from previous search response"),
-    max_result: int = Query(20, description="Maximum number of additional results")
+    max_result: int = Query(20, description="Maximum number of additional results"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Get more hotel search results using session ID and next token
@@ -156,7 +181,8 @@ async def get_more_hotel_results(
         result = await hotel_api_service.get_more_hotel_results(
             session_id=session_id,
             next_token=next_token,
-            max_result=max_result
+            max_result=max_result,
+            fields=parse_fields(fields)
         )
         
         if not result["success"]:
@@ -190,7 +216,8 @@ async def get_more_hotel_results(
 @router.get("/more-results-pagination")
 async def get_more_hotel_results_pagination(
     session_id: str = Query(..., description="Session ID from previous hotel search"),
-    next_token: str = Query(..., description="Next token from previous search response")
+    next_token: str = Query(..., description="Next token from previous search response"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Get more hotel search results using pagination without maxResult limitation
@@ -206,7 +233,8 @@ async def get_more_hotel_results_pagination(
     try:
         result = await hotel_api_service.get_more_hotel_results_pagination(
             session_id=session_id,
-            next_token=next_token
+            next_token=next_token,
+            fields=parse_fields(fields)
         )
         
         if not result["success"]:
@@ -251,7 +279,8 @@ async def filter_hotel_results(
     property_type: Optional[str] = Query(None, description="Filter by property type (HOTELS,RESORTS,APARTMENTS)"),
     facility: Optional[str] = Query(None, description="Filter by facilities, comma-separated"),
     sorting: Optional[str] = Query(None, description="Sort results: price-low-high, price-high-low, rating-low-high, rating-high-low, alpha-A-Z, alpha-Z-A, distance-low-high, distance-high-low"),
-    locality: Optional[str] = Query(None, description="Filter by locality/region, comma-separated")
+    locality: Optional[str] = Query(None, description="Filter by locality/region, comma-separated"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Filter hotel search results based on various criteria
@@ -283,7 +312,8 @@ async def filter_hotel_results(
             property_type=property_type,
             facility=facility,
             sorting=sorting,
-            locality=locality
+            locality=locality,
+            fields=parse_fields(fields)
         )
         
         if not result["success"]:
@@ -337,7 +367,8 @@ async def filter_hotel_results(
 async def get_more_filter_results(
     session_id: str = Query(..., description="Session ID from previous hotel search"),
     next_token: str = Query(..., description="Next token from previous filter response"),
-    filter_key: str = Query(..., description="Filter key from previous filter response")
+    filter_key: str = Query(..., description="Filter key from previous filter response"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Get more hotel filter results using session ID, next token, and filter key
@@ -353,7 +384,8 @@ async def get_more_filter_results(
         result = await hotel_api_service.get_more_filter_results(
             session_id=session_id,
             next_token=next_token,
-            filter_key=filter_key
+            filter_key=filter_key,
+            fields=parse_fields(fields)
         )
         
         if not result["success"]:
@@ -390,7 +422,8 @@ async def get_more_filter_results(
 async def get_more_filter_results_pagination(
     session_id: str = Query(..., description="Session ID from previous hotel search"),
     next_token: str = Query(..., description="Next token from previous filter response"),
-    filter_key: str = Query(..., description="Filter key from previous filter response")
+    filter_key: str = Query(..., description="Filter key from previous filter response"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Get more hotel filter results using pagination without result count limitation
@@ -411,7 +444,8 @@ async def get_more_filter_results_pagination(
         result = await hotel_api_service.get_more_filter_results_pagination(
             session_id=session_id,
             next_token=next_token,
-            filter_key=filter_key
+            filter_key=filter_key,
+            fields=parse_fields(fields)
         )
         
         if not result["success"]:
@@ -575,6 +609,126 @@ async def get_room_rates(
             detail=f"Room rates error: {str(e)}"
         )
 
+@router.post("/room-rates/bulk")
+async def get_bulk_room_rates(
+    rates_request: Dict[str, Any] = Body(..., description="Bulk room rates request data")
+):
+    """
+    Get room rates for a shortlist of hotels in a single request
+    
+    Request body should contain:
+    - session_id: Search session ID
+    - check_in_date: Check-in date (YYYY-MM-DD)
+    - check_out_date: Check-out date (YYYY-MM-DD)
+    - adults / children: Guest counts (optional, default 1 adult)
+    - child_ages: Array of child ages (optional, defaults to 5 per child)
+    - hotels: Array of shortlisted hotels from search results, each with
+      hotel_id, product_id and token_id
+    
+    Rates are fetched concurrently and cached for the search session, so
+    compare views can load every shortlisted hotel with one call. They are
+    returned keyed by product_id, since one hotel can be shortlisted with
+    several offers.
+    """
+    try:
+        required_fields = ["session_id", "check_in_date", "check_out_date", "hotels"]
+        missing_fields = [field for field in required_fields if field not in rates_request]
+        
+        if missing_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Missing required fields: {', '.join(missing_fields)}"
+            )
+        
+        hotels = rates_request["hotels"]
+        if not isinstance(hotels, list) or len(hotels) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="hotels must be a non-empty array"
+            )
+        
+        max_hotels = 25
+        if len(hotels) > max_hotels:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Maximum {max_hotels} hotels allowed per request"
+            )
+        
+        for i, hotel in enumerate(hotels):
+            for field in ["hotel_id", "product_id", "token_id"]:
+                if not isinstance(hotel, dict) or not hotel.get(field):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Missing {field} in hotels[{i}]"
+                    )
+        
+        adults = rates_request.get("adults", 1)
+        children = rates_request.get("children", 0)
+        child_ages = rates_request.get("child_ages")
+        if children > 0 and child_ages:
+            if (
+                not isinstance(child_ages, list)
+                or len(child_ages) != children
+                or not all(isinstance(age, int) for age in child_ages)
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="child_ages must be an array of one integer age per child"
+                )
+        elif children > 0:
+            # Default child ages if not provided
+            child_ages = [5] * children
+        else:
+            child_ages = []
+        
+        rooms = [
+            {
+                "adults": adults,
+                "children": children,
+                "child_ages": child_ages
+            }
+        ]
+        
+        result = await hotel_api_service.get_bulk_room_rates(
+            session_id=rates_request["session_id"],
+            hotels=hotels,
+            check_in_date=rates_request["check_in_date"],
+            check_out_date=rates_request["check_out_date"],
+            rooms=rooms
+        )
+        
+        if not result["success"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=result.get("error") or "Failed to get room rates"
+            )
+        
+        return {
+            "success": True,
+            "room_rates": result["room_rates"],
+            "failed_hotels": result["failed_hotels"],
+            "request_metadata": {
+                "session_id": rates_request["session_id"],
+                "check_in": rates_request["check_in_date"],
+                "check_out": rates_request["check_out_date"],
+                "guests": {
+                    "adults": adults,
+                    "children": children,
+                    "child_ages": child_ages
+                },
+                "hotels_requested": len(hotels),
+                "cache_hits": result["cache_hits"]
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bulk room rates error: {str(e)}"
+        )
+
 @router.post("/book")
 async def book_hotel(
     booking_data: Dict[str, Any] = Body(..., description="Hotel booking request data")
@@ -958,20 +1112,24 @@ async def get_static_content(
 async def get_cities():
     """
     Get list of supported cities for hotel search
+    
+    Served from the cached city catalogue, which is persisted in MongoDB
+    and refreshed from the supplier on a schedule.
     """
     try:
-        result = await hotel_api_service.get_cities()
+        result = await hotel_city_service.get_cities()
         
         if not result["success"]:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=result.get("error", "Failed to get cities list")
+                detail=result.get("error") or "Failed to get cities list"
             )
         
         return {
             "success": True,
             "cities": result["cities"],
-            "total_cities": result.get("total_cities", len(result["cities"]))
+            "total_cities": result.get("total_cities", len(result["cities"])),
+            "last_refreshed": result.get("last_refreshed")
         }
         
     except HTTPException:
@@ -982,6 +1140,26 @@ async def get_cities():
             detail=f"Cities list error: {str(e)}"
         )
 
+@router.get("/cities/suggest")
+async def suggest_cities(
+    q: str = Query(..., min_length=1, description="City or country text typed in the search box"),
+    limit: int = Query(10, ge=1, le=20, description="Maximum number of suggestions")
+):
+    """
+    Autocomplete city/country candidates for the hotel search box
+    
+    Prefix matches on any word of the city or country name come first,
+    followed by typo-tolerant matches (edit distance 1-2) when there are
+    not enough prefix matches.
+    """
+    suggestions = hotel_city_service.suggest(q, limit)
+    return {
+        "success": True,
+        "query": q,
+        "suggestions": suggestions,
+        "total_suggestions": len(suggestions)
+    }
+
 @router.get("/", response_model=List[HotelResponse])
 async def get_all_hotels(limit: Optional[int] = Query(50)):
     hotels = await db_service.get_hotels(limit=limit)
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Request
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response, Query
+from typing import List, Optional
 from ..models import PaymentCreate, PaymentResponse, TokenData
 from ..auth import get_current_user, require_admin
 from ..mongodb_database import db_service
-from ..payment import payment_service
+from ..payment import payment_service, STRIPE_WEBHOOK_EVENT, WEBHOOK_OUTCOMES
+from ..services.event_queue import event_queue_service
+from ..pagination import NEXT_CURSOR_HEADER
 import json
 
 router = APIRouter(prefix="/payments", tags=["payments"])
@@ -75,14 +77,14 @@ async def stripe_webhook(request: Request):
         payload = await request.body()
         event = json.loads(payload)
         
-        # Handle Stripe webhook events
-        if event["type"] == "payment_intent.succeeded":
-            payment_intent = event["data"]["object"]
-            await payment_service.handle_payment_success(payment_intent["id"])
-        
-        elif event["type"] == "payment_intent.payment_failed":
-            payment_intent = event["data"]["object"]
-            await payment_service.handle_payment_failure(payment_intent["id"])
+        # Store the raw event and acknowledge; it is applied in the background.
+        # Stripe retries reuse the event id, so a redelivery is stored only once
+        if event["type"] in WEBHOOK_OUTCOMES:
+            await event_queue_service.publish(
+                STRIPE_WEBHOOK_EVENT,
+                event,
+                idempotency_key=f"stripe:{event['id']}"
+            )
         
         return {"status": "success"}
     
@@ -93,22 +95,28 @@ async def stripe_webhook(request: Request):
         )
 
 @router.get("/my-payments", response_model=List[PaymentResponse])
-async def get_my_payments(current_user: TokenData = Depends(get_current_user)):
+async def get_my_payments(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    current_user: TokenData = Depends(get_current_user)
+):
     try:
-        # Get user's bookings first
-        bookings = await db_service.get_user_bookings(current_user.uid)
-        
-        payments = []
-        for booking in bookings:
-            booking_payments = await db_service.get_payments_by_booking(booking["id"])
-            payments.extend(booking_payments)
-        
-        return payments
+        payments, next_cursor = await db_service.list_user_payments(current_user.uid, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch payments: {str(e)}"
         )
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return payments
 
 @router.get("/{payment_id}", response_model=PaymentResponse)
 async def get_payment(
@@ -136,7 +144,7 @@ async def get_payment(
 @router.get("/", response_model=List[PaymentResponse])
 async def get_all_payments(current_user = Depends(require_admin)):
     try:
-        payments = await db_service.get_all_payments()
+        payments = await db_service.list_payments()
         return payments
     except Exception as e:
         raise HTTPException(
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional
+from datetime import datetime
 from ..models.franchise import (
     FranchisePartner, FranchiseBooking, FranchiseCommission, 
-    FranchiseStats, FranchiseStatus
+    FranchiseStats, FranchiseStatus,
+    FranchisePartnerPage, FranchiseBookingPage, FranchiseCommissionPage
 )
 from ..mongodb_models import User
 from ..auth import get_current_user
+from ..pagination import fetch_page
+from ..services.franchise_analytics import franchise_analytics_service, RollupRebuildInProgressError
 
 router = APIRouter(prefix="/franchise", tags=["franchise"])
 
+async def _fetch_page_or_400(query, sort_field: str, limit: int, cursor: Optional[str], offset: int):
+    # Endpoints below take a "status" query param, which shadows fastapi.status
+    try:
+        return await fetch_page(query, sort_field, limit, cursor, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/stats", response_model=FranchiseStats)
 async def get_franchise_stats(current_user: User = Depends(get_current_user)):
     """Get overall franchise statistics"""
@@ -24,36 +34,8 @@ async def get_franchise_stats(current_user: User = Depends(get_current_user)):
         FranchisePartner.status == FranchiseStatus.ACTIVE
     ).count()
     
-    # Get total bookings and revenue
-    bookings = await FranchiseBooking.find_all().to_list()
-    total_bookings = len(bookings)
-    total_revenue = sum(booking.amount for booking in bookings)
-    
-    # Calculate monthly growth
-    current_month = datetime.utcnow().replace(day=1)
-    last_month = (current_month - timedelta(days=1)).replace(day=1)
-    
-    current_month_bookings = await FranchiseBooking.find(
-        FranchiseBooking.booking_date >= current_month
-    ).to_list()
-    last_month_bookings = await FranchiseBooking.find(
-        FranchiseBooking.booking_date >= last_month,
-        FranchiseBooking.booking_date < current_month
-    ).to_list()
-    
-    current_revenue = sum(b.amount for b in current_month_bookings)
-    last_revenue = sum(b.amount for b in last_month_bookings)
-    monthly_growth = ((current_revenue - last_revenue) / last_revenue * 100) if last_revenue > 0 else 0
-    
-    # Get top destinations
-    destinations = {}
-    for booking in bookings:
-        destinations[booking.destination] = destinations.get(booking.destination, 0) + 1
-    
-    top_destinations = [
-        {"destination": dest, "bookings": count}
-        for dest, count in sorted(destinations.items(), key=lambda x: x[1], reverse=True)[:5]
-    ]
+    # Totals, growth and top destinations are aggregated in MongoDB
+    summary = await franchise_analytics_service.get_booking_summary()
     
     # Get recent bookings
     recent_bookings = await FranchiseBooking.find().sort("-booking_date").limit(5).to_list()
@@ -71,21 +53,22 @@ async def get_franchise_stats(current_user: User = Depends(get_current_user)):
     return FranchiseStats(
         total_partners=total_partners,
         active_partners=active_partners,
-        total_bookings=total_bookings,
-        total_revenue=total_revenue,
-        monthly_growth=monthly_growth,
-        top_destinations=top_destinations,
+        total_bookings=summary["total_bookings"],
+        total_revenue=summary["total_revenue"],
+        monthly_growth=summary["monthly_growth"],
+        top_destinations=summary["top_destinations"],
         recent_bookings=recent_bookings_data
     )
 
-@router.get("/partners", response_model=List[FranchisePartner])
+@router.get("/partners", response_model=FranchisePartnerPage)
 async def get_franchise_partners(
     status: Optional[FranchiseStatus] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get franchise partners with optional filtering"""
+    """Get franchise partners with optional filtering, newest first (pass next_cursor back as cursor for the next page)"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -96,8 +79,8 @@ async def get_franchise_partners(
     if status:
         query = query.find(FranchisePartner.status == status)
     
-    partners = await query.skip(offset).limit(limit).to_list()
-    return partners
+    partners, next_cursor = await _fetch_page_or_400(query, "registration_date", limit, cursor, offset)
+    return {"partners": partners, "next_cursor": next_cursor}
 
 @router.post("/partners", response_model=FranchisePartner)
 async def create_franchise_partner(
@@ -158,15 +141,16 @@ async def update_franchise_partner(
     await partner.set(partner_data)
     return partner
 
-@router.get("/bookings", response_model=List[FranchiseBooking])
+@router.get("/bookings", response_model=FranchiseBookingPage)
 async def get_franchise_bookings(
     partner_id: Optional[str] = None,
     status: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get franchise bookings with optional filtering"""
+    """Get franchise bookings with optional filtering (pass next_cursor back as cursor for the next page)"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -180,18 +164,19 @@ async def get_franchise_bookings(
     if status:
         query = query.find(FranchiseBooking.status == status)
     
-    bookings = await query.sort("-booking_date").skip(offset).limit(limit).to_list()
-    return bookings
+    bookings, next_cursor = await _fetch_page_or_400(query, "booking_date", limit, cursor, offset)
+    return {"bookings": bookings, "next_cursor": next_cursor}
 
-@router.get("/commissions", response_model=List[FranchiseCommission])
+@router.get("/commissions", response_model=FranchiseCommissionPage)
 async def get_franchise_commissions(
     partner_id: Optional[str] = None,
     payment_status: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get franchise commissions with optional filtering"""
+    """Get franchise commissions with optional filtering (pass next_cursor back as cursor for the next page)"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -205,8 +190,8 @@ async def get_franchise_commissions(
     if payment_status:
         query = query.find(FranchiseCommission.payment_status == payment_status)
     
-    commissions = await query.sort("-created_at").skip(offset).limit(limit).to_list()
-    return commissions
+    commissions, next_cursor = await _fetch_page_or_400(query, "created_at", limit, cursor, offset)
+    return {"commissions": commissions, "next_cursor": next_cursor}
 
 @router.post("/commissions/{commission_id}/pay")
 async def pay_commission(
@@ -247,29 +232,19 @@ async def get_revenue_analytics(
             detail="Admin access required"
         )
     
-    query = FranchiseBooking.find()
-    
-    if partner_id:
-        query = query.find(FranchiseBooking.partner_id == partner_id)
-    if start_date:
-        query = query.find(FranchiseBooking.booking_date >= start_date)
-    if end_date:
-        query = query.find(FranchiseBooking.booking_date <= end_date)
-    
-    bookings = await query.to_list()
-    
-    # Group by month
-    monthly_data = {}
-    for booking in bookings:
-        month_key = booking.booking_date.strftime("%Y-%m")
-        if month_key not in monthly_data:
-            monthly_data[month_key] = {"revenue": 0, "bookings": 0}
-        monthly_data[month_key]["revenue"] += booking.amount
-        monthly_data[month_key]["bookings"] += 1
+    return await franchise_analytics_service.get_revenue_analytics(partner_id, start_date, end_date)
+
+@router.post("/analytics/rollups/rebuild")
+async def rebuild_analytics_rollups(current_user: User = Depends(get_current_user)):
+    """Recompute franchise daily rollups from raw bookings"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
     
-    return {
-        "monthly_data": monthly_data,
-        "total_revenue": sum(booking.amount for booking in bookings),
-        "total_bookings": len(bookings),
-        "average_booking_value": sum(booking.amount for booking in bookings) / len(bookings) if bookings else 0
-    }
\ No newline at end of file
+    try:
+        rows = await franchise_analytics_service.rebuild_rollups()
+    except RollupRebuildInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return {"message": "Franchise rollups rebuilt", "rollup_rows": rows}
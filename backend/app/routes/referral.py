@@ -1,54 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime, timedelta
 import secrets
 import string
+from pymongo.errors import DuplicateKeyError
 from ..models.referral import (
     ReferralCode, Referral, ReferralEarning, UserReferralStats,
     ReferralStatus, ReferralTier, ReferralReward
 )
 from ..mongodb_models import User
 from ..auth import get_current_user
+from ..pagination import keyset_filter, keyset_sort, split_page
+from ..mongodb_database import run_in_transaction, get_or_create
+from ..services.event_queue import event_queue_service
+from ..services.reward_events import REFERRAL_REGISTERED, REFERRAL_BOOKED
 
 router = APIRouter(prefix="/referral", tags=["referral"])
 
+REFERRAL_CODE_ATTEMPTS = 5
+
 def generate_referral_code(length: int = 12) -> str:
-    """Generate a unique referral code"""
+    """Generate a random referral code (uniqueness is enforced by the index)"""
     characters = string.ascii_uppercase + string.digits
     return ''.join(secrets.choice(characters) for _ in range(length))
 
 @router.get("/code")
 async def get_or_create_referral_code(current_user: User = Depends(get_current_user)):
     """Get user's referral code or create one if it doesn't exist"""
-    existing_code = await ReferralCode.find_one(ReferralCode.user_id == str(current_user.id))
-    
-    if existing_code:
-        return {"code": existing_code.code, "uses_count": existing_code.uses_count}
-    
-    # Create new referral code
-    code = generate_referral_code()
-    
-    # Ensure code is unique
-    while await ReferralCode.find_one(ReferralCode.code == code):
-        code = generate_referral_code()
-    
-    referral_code = ReferralCode(
-        user_id=str(current_user.id),
-        code=code
+    # One upsert returns the existing code or inserts a new one; the unique
+    # index on code rejects the (rare) collision and we retry with a new code
+    for _ in range(REFERRAL_CODE_ATTEMPTS):
+        try:
+            referral_code = await get_or_create(
+                ReferralCode,
+                {"user_id": str(current_user.id)},
+                defaults={"code": generate_referral_code()}
+            )
+            return {"code": referral_code.code, "uses_count": referral_code.uses_count}
+        except DuplicateKeyError:
+            continue
+    
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Could not allocate a referral code, please retry"
     )
-    await referral_code.create()
-    
-    return {"code": code, "uses_count": 0}
 
 @router.get("/stats")
 async def get_referral_stats(current_user: User = Depends(get_current_user)):
     """Get user's referral statistics"""
-    stats = await UserReferralStats.find_one(UserReferralStats.user_id == str(current_user.id))
-    
-    if not stats:
-        # Create initial stats
-        stats = UserReferralStats(user_id=str(current_user.id))
-        await stats.create()
+    stats = await get_or_create(UserReferralStats, {"user_id": str(current_user.id)})
     
     # Get referral code
     referral_code = await ReferralCode.find_one(ReferralCode.user_id == str(current_user.id))
@@ -121,13 +121,11 @@ async def create_referral(
     await referral_code.save()
     
     # Update user stats
-    stats = await UserReferralStats.find_one(UserReferralStats.user_id == str(current_user.id))
-    if not stats:
-        stats = UserReferralStats(user_id=str(current_user.id))
-    
-    stats.total_referrals += 1
-    stats.last_updated = datetime.utcnow()
-    await stats.save()
+    await get_or_create(
+        UserReferralStats,
+        {"user_id": str(current_user.id)},
+        update={"$inc": {"total_referrals": 1}, "$set": {"last_updated": datetime.utcnow()}}
+    )
     
     return {"message": "Referral created successfully", "referral_id": str(referral.id)}
 
@@ -146,39 +144,14 @@ async def register_with_referral(referral_code: str, user_id: str):
             detail="Invalid or expired referral code"
         )
     
-    # Update referral
-    referral.referred_id = user_id
-    referral.status = ReferralStatus.REGISTERED
-    referral.registration_date = datetime.utcnow()
-    await referral.save()
-    
-    # Create registration earning
-    earning = ReferralEarning(
-        user_id=referral.referrer_id,
-        referral_id=str(referral.id),
-        amount=referral.registration_reward,
-        type="registration"
+    # The earning, referrer stats and tier upgrade are applied in the background
+    event = await event_queue_service.publish(
+        REFERRAL_REGISTERED,
+        {"referral_code": referral_code, "user_id": user_id},
+        idempotency_key=f"{REFERRAL_REGISTERED}:{referral_code}:{user_id}"
     )
-    await earning.create()
     
-    # Update referrer stats
-    stats = await UserReferralStats.find_one(UserReferralStats.user_id == referral.referrer_id)
-    if stats:
-        stats.pending_rewards += referral.registration_reward
-        stats.tier_points += 1
-        stats.last_updated = datetime.utcnow()
-        
-        # Check for tier upgrade
-        if stats.tier_points >= 50 and stats.current_tier != ReferralTier.PLATINUM:
-            stats.current_tier = ReferralTier.PLATINUM
-        elif stats.tier_points >= 25 and stats.current_tier not in [ReferralTier.GOLD, ReferralTier.PLATINUM]:
-            stats.current_tier = ReferralTier.GOLD
-        elif stats.tier_points >= 10 and stats.current_tier == ReferralTier.BRONZE:
-            stats.current_tier = ReferralTier.SILVER
-        
-        await stats.save()
-    
-    return {"message": "Referral registration processed"}
+    return {"message": "Referral registration queued", "event_id": str(event.id)}
 
 @router.post("/booking/{user_id}")
 async def process_referral_booking(user_id: str, booking_amount: float):
@@ -192,65 +165,78 @@ async def process_referral_booking(user_id: str, booking_amount: float):
     if not referral:
         return {"message": "No active referral found for this user"}
     
-    # Update referral
-    referral.status = ReferralStatus.BOOKED
-    referral.first_booking_date = datetime.utcnow()
-    await referral.save()
-    
-    # Create booking earning
-    earning = ReferralEarning(
-        user_id=referral.referrer_id,
-        referral_id=str(referral.id),
-        amount=referral.booking_reward,
-        type="booking"
+    # Only the first booking pays out, so the referral identifies the event
+    event = await event_queue_service.publish(
+        REFERRAL_BOOKED,
+        {"user_id": user_id, "booking_amount": booking_amount},
+        idempotency_key=f"{REFERRAL_BOOKED}:{referral.id}"
     )
-    await earning.create()
     
-    # Update referrer stats
-    stats = await UserReferralStats.find_one(UserReferralStats.user_id == referral.referrer_id)
-    if stats:
-        stats.successful_bookings += 1
-        stats.pending_rewards += referral.booking_reward
-        stats.tier_points += 5  # More points for successful bookings
-        stats.last_updated = datetime.utcnow()
-        await stats.save()
-    
-    return {"message": "Referral booking processed", "reward": referral.booking_reward}
+    return {"message": "Referral booking queued", "reward": referral.booking_reward, "event_id": str(event.id)}
 
 @router.get("/earnings")
 async def get_referral_earnings(
     status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's referral earnings"""
-    query = ReferralEarning.find(ReferralEarning.user_id == str(current_user.id))
-    
+    """Get user's referral earnings (pass next_cursor back as cursor for the next page)"""
+    match = {"user_id": str(current_user.id)}
     if status:
-        query = query.find(ReferralEarning.status == status)
-    
-    earnings = await query.sort("-created_at").to_list()
+        match["status"] = status
+    
+    try:
+        page_filter = keyset_filter("created_at", cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # One round trip: the page joined to its referrals, and totals over all matching earnings
+    pipeline = [
+        {"$match": match},
+        {"$facet": {
+            "page": [
+                {"$match": page_filter},
+                {"$sort": dict(keyset_sort("created_at"))},
+                {"$limit": limit + 1},
+                {"$lookup": {
+                    "from": Referral.get_motor_collection().name,
+                    "let": {"referral_id": {"$convert": {"input": "$referral_id", "to": "objectId", "onError": None}}},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$eq": ["$_id", "$$referral_id"]}}},
+                        {"$project": {"referred_email": 1}}
+                    ],
+                    "as": "referral"
+                }}
+            ],
+            "totals": [
+                {"$group": {"_id": "$status", "amount": {"$sum": "$amount"}}}
+            ]
+        }}
+    ]
+    result = (await ReferralEarning.get_motor_collection().aggregate(pipeline).to_list(length=1))[0]
     
-    total_earned = sum(e.amount for e in earnings if e.status == "paid")
-    pending_amount = sum(e.amount for e in earnings if e.status == "pending")
+    earnings, next_cursor = split_page(result["page"], limit, "created_at")
+    totals = {row["_id"]: row["amount"] for row in result["totals"]}
     
     earning_history = []
     for earning in earnings:
-        # Get referral details
-        referral = await Referral.get(earning.referral_id)
+        referral = earning["referral"][0] if earning["referral"] else None
         earning_history.append({
-            "id": str(earning.id),
-            "amount": earning.amount,
-            "type": earning.type,
-            "status": earning.status,
-            "date": earning.created_at.isoformat(),
-            "payment_date": earning.payment_date.isoformat() if earning.payment_date else None,
-            "referred_email": referral.referred_email if referral else "Unknown"
+            "id": str(earning["_id"]),
+            "amount": earning["amount"],
+            "type": earning["type"],
+            "status": earning["status"],
+            "date": earning["created_at"].isoformat(),
+            "payment_date": earning["payment_date"].isoformat() if earning.get("payment_date") else None,
+            "referred_email": referral["referred_email"] if referral else "Unknown"
         })
     
     return {
-        "total_earned": total_earned,
-        "pending_amount": pending_amount,
-        "earnings_history": earning_history
+        "total_earned": totals.get("paid", 0),
+        "pending_amount": totals.get("pending", 0),
+        "earnings_history": earning_history,
+        "next_cursor": next_cursor
     }
 
 @router.get("/tiers")
@@ -305,26 +291,50 @@ async def withdraw_earnings(
         )
     
     # Process withdrawal (integrate with payment system)
-    # For now, just mark earnings as paid
-    pending_earnings = await ReferralEarning.find(
-        ReferralEarning.user_id == str(current_user.id),
-        ReferralEarning.status == "pending"
-    ).to_list()
-    
+    # For now, just mark earnings as paid, oldest first
+    user_id = str(current_user.id)
+    pending_earnings = await ReferralEarning.get_motor_collection().find(
+        {"user_id": user_id, "status": "pending"},
+        {"amount": 1}
+    ).sort([("created_at", 1), ("_id", 1)]).to_list(length=None)
+    
+    earning_ids = []
     remaining_amount = amount
     for earning in pending_earnings:
         if remaining_amount <= 0:
             break
         
-        if earning.amount <= remaining_amount:
-            earning.status = "paid"
-            earning.payment_date = datetime.utcnow()
-            await earning.save()
-            remaining_amount -= earning.amount
+        if earning["amount"] <= remaining_amount:
+            earning_ids.append(earning["_id"])
+            remaining_amount -= earning["amount"]
+    
+    async def apply_withdrawal(session):
+        now = datetime.utcnow()
+        # Guarded decrement first: without a transaction this is what stops
+        # two concurrent withdrawals from overdrawing pending rewards
+        stats_result = await UserReferralStats.get_motor_collection().update_one(
+            {"user_id": user_id, "pending_rewards": {"$gte": amount}},
+            {"$inc": {"pending_rewards": -amount, "total_earnings": amount}, "$set": {"last_updated": now}},
+            session=session
+        )
+        if stats_result.modified_count != 1:
+            raise ValueError("Insufficient funds for withdrawal")
+        
+        earnings_result = await ReferralEarning.get_motor_collection().update_many(
+            {"_id": {"$in": earning_ids}, "status": "pending"},
+            {"$set": {"status": "paid", "payment_date": now}},
+            session=session
+        )
+        if session is not None and earnings_result.modified_count != len(earning_ids):
+            # Another withdrawal paid some of these earnings; roll back and let the client retry
+            raise ValueError("Withdrawal conflicted with another request, please retry")
     
-    # Update stats
-    stats.pending_rewards -= amount
-    stats.total_earnings += amount
-    await stats.save()
+    try:
+        await run_in_transaction(apply_withdrawal)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     return {"message": f"Withdrawal of ${amount} processed successfully"}
\ No newline at end of file
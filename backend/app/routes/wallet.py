@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from beanie import PydanticObjectId
 from typing import List, Optional
+from pymongo import ReturnDocument
 from datetime import datetime, timedelta
 from ..models.wallet import (
     Wallet, Transaction, PaymentMethod, RewardItem, RewardRedemption,
@@ -8,51 +10,19 @@ from ..models.wallet import (
 )
 from ..mongodb_models import User
 from ..auth import get_current_user
+from ..pagination import fetch_page
+from ..mongodb_database import run_in_transaction
+from ..services.wallet_ledger import wallet_ledger_service, InsufficientFundsError
+from ..services.event_queue import event_queue_service
+from ..services.reward_catalogue import reward_catalogue_service
+from ..services.reward_events import POINTS_EARNED
 
 router = APIRouter(prefix="/wallet", tags=["wallet"])
 
 @router.get("/", response_model=WalletStats)
 async def get_wallet(current_user: User = Depends(get_current_user)):
     """Get user's wallet information"""
-    wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-    
-    if not wallet:
-        # Create wallet if it doesn't exist
-        wallet = Wallet(user_id=str(current_user.id))
-        await wallet.create()
-    
-    # Get transaction count
-    transaction_count = await Transaction.find(
-        Transaction.user_id == str(current_user.id)
-    ).count()
-    
-    # Calculate tier progress
-    tier_thresholds = {
-        MembershipTier.BRONZE: 0,
-        MembershipTier.SILVER: 5000,
-        MembershipTier.GOLD: 15000,
-        MembershipTier.PLATINUM: 30000
-    }
-    
-    current_threshold = tier_thresholds[wallet.membership_tier]
-    next_tier_points = 0
-    
-    if wallet.membership_tier != MembershipTier.PLATINUM:
-        next_tiers = [t for t, points in tier_thresholds.items() if points > current_threshold]
-        if next_tiers:
-            next_tier = min(next_tiers, key=lambda t: tier_thresholds[t])
-            next_tier_points = tier_thresholds[next_tier] - wallet.tier_points
-    
-    tier_progress = (wallet.tier_points - current_threshold) / (tier_thresholds.get(next_tier, 30000) - current_threshold) * 100 if next_tier_points > 0 else 100
-    
-    return WalletStats(
-        total_balance=wallet.balance,
-        total_points=wallet.points,
-        total_transactions=transaction_count,
-        cashback_earned=wallet.total_cashback,
-        membership_tier=wallet.membership_tier.value,
-        tier_progress=tier_progress
-    )
+    return await wallet_ledger_service.get_summary(str(current_user.id))
 
 @router.post("/deposit")
 async def deposit_funds(
@@ -80,34 +50,24 @@ async def deposit_funds(
             detail="Payment method not found"
         )
     
-    # Get or create wallet
-    wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-    if not wallet:
-        wallet = Wallet(user_id=str(current_user.id))
-        await wallet.create()
-    
-    # Create transaction
-    transaction = Transaction(
-        user_id=str(current_user.id),
-        wallet_id=str(wallet.id),
-        type=TransactionType.DEPOSIT,
-        amount=amount,
-        description=f"Wallet deposit via {payment_method.name}",
-        payment_method_id=payment_method_id,
-        status=TransactionStatus.COMPLETED,
-        completed_at=datetime.utcnow()
+    # Credit the wallet (created if missing) and record the transaction
+    wallet, (transaction,) = await wallet_ledger_service.record(
+        str(current_user.id),
+        [{
+            "type": TransactionType.DEPOSIT,
+            "amount": amount,
+            "description": f"Wallet deposit via {payment_method.name}",
+            "payment_method_id": payment_method_id,
+            "status": TransactionStatus.COMPLETED,
+            "completed_at": datetime.utcnow()
+        }],
+        balance=amount
     )
-    await transaction.create()
-    
-    # Update wallet balance
-    wallet.balance += amount
-    wallet.updated_at = datetime.utcnow()
-    await wallet.save()
     
     return {
         "message": "Deposit successful",
         "transaction_id": str(transaction.id),
-        "new_balance": wallet.balance
+        "new_balance": wallet["balance"]
     }
 
 @router.post("/deposit/stripe")
@@ -145,23 +105,17 @@ async def create_deposit_payment_intent(
             }
         )
         
-        # Get or create wallet
-        wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-        if not wallet:
-            wallet = Wallet(user_id=str(current_user.id))
-            await wallet.create()
-        
-        # Create pending transaction
-        transaction = Transaction(
-            user_id=str(current_user.id),
-            wallet_id=str(wallet.id),
-            type=TransactionType.DEPOSIT,
-            amount=amount,
-            description=f"Wallet deposit via Stripe - ${amount}",
-            reference_id=intent.id,
-            status=TransactionStatus.PENDING
+        # Record the pending transaction; the balance is credited on confirm
+        _, (transaction,) = await wallet_ledger_service.record(
+            str(current_user.id),
+            [{
+                "type": TransactionType.DEPOSIT,
+                "amount": amount,
+                "description": f"Wallet deposit via Stripe - ${amount}",
+                "reference_id": intent.id,
+                "status": TransactionStatus.PENDING
+            }]
         )
-        await transaction.create()
         
         return {
             "client_secret": intent.client_secret,
@@ -197,35 +151,25 @@ async def demo_deposit(
         )
     
     try:
-        # Get or create wallet
-        wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-        if not wallet:
-            wallet = Wallet(user_id=str(current_user.id))
-            await wallet.create()
-        
-        # Create completed transaction
-        transaction = Transaction(
-            user_id=str(current_user.id),
-            wallet_id=str(wallet.id),
-            type=TransactionType.DEPOSIT,
-            amount=amount,
-            description=f"Demo wallet deposit - AED {amount}",
-            reference_id=f"demo_{datetime.utcnow().timestamp()}",
-            status=TransactionStatus.COMPLETED,
-            completed_at=datetime.utcnow()
+        # Credit the wallet (created if missing) and record a completed transaction
+        wallet, (transaction,) = await wallet_ledger_service.record(
+            str(current_user.id),
+            [{
+                "type": TransactionType.DEPOSIT,
+                "amount": amount,
+                "description": f"Demo wallet deposit - AED {amount}",
+                "reference_id": f"demo_{datetime.utcnow().timestamp()}",
+                "status": TransactionStatus.COMPLETED,
+                "completed_at": datetime.utcnow()
+            }],
+            balance=amount
         )
-        await transaction.create()
-        
-        # Update wallet balance
-        wallet.balance += amount
-        wallet.updated_at = datetime.utcnow()
-        await wallet.save()
         
         return {
             "message": "Demo deposit successful",
             "transaction_id": str(transaction.id),
             "amount": amount,
-            "new_balance": wallet.balance
+            "new_balance": wallet["balance"]
         }
         
     except Exception as e:
@@ -261,13 +205,29 @@ async def confirm_deposit_payment(
                 detail="Invalid payment intent ID"
             )
         
-        # Find the pending transaction
-        transaction = await Transaction.find_one(
-            Transaction.reference_id == payment_intent_id,
-            Transaction.user_id == str(current_user.id),
-            Transaction.type == TransactionType.DEPOSIT,
-            Transaction.status == TransactionStatus.PENDING
-        )
+        async def complete_deposit(session):
+            # Claiming the pending transaction first means a repeated confirm
+            # finds nothing and cannot credit the wallet twice
+            transaction = await Transaction.get_motor_collection().find_one_and_update(
+                {
+                    "reference_id": payment_intent_id,
+                    "user_id": str(current_user.id),
+                    "type": TransactionType.DEPOSIT.value,
+                    "status": TransactionStatus.PENDING.value
+                },
+                {"$set": {"status": TransactionStatus.COMPLETED.value, "completed_at": datetime.utcnow()}},
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            if not transaction:
+                return None, None
+            
+            wallet = await wallet_ledger_service.adjust(
+                str(current_user.id), balance=transaction["amount"], session=session
+            )
+            return transaction, wallet
+        
+        transaction, wallet = await run_in_transaction(complete_deposit)
         
         if not transaction:
             raise HTTPException(
@@ -275,23 +235,11 @@ async def confirm_deposit_payment(
                 detail="Transaction not found"
             )
         
-        # Update transaction status
-        transaction.status = TransactionStatus.COMPLETED
-        transaction.completed_at = datetime.utcnow()
-        await transaction.save()
-        
-        # Update wallet balance
-        wallet = await Wallet.find_one(Wallet.id == transaction.wallet_id)
-        if wallet:
-            wallet.balance += transaction.amount
-            wallet.updated_at = datetime.utcnow()
-            await wallet.save()
-        
         return {
             "message": "Deposit confirmed successfully",
-            "transaction_id": str(transaction.id),
-            "amount": transaction.amount,
-            "new_balance": wallet.balance if wallet else 0
+            "transaction_id": str(transaction["_id"]),
+            "amount": transaction["amount"],
+            "new_balance": wallet["balance"]
         }
         
     except HTTPException:
@@ -315,14 +263,6 @@ async def withdraw_funds(
             detail="Amount must be greater than 0"
         )
     
-    # Get wallet
-    wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-    if not wallet or wallet.balance < amount:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Insufficient funds"
-        )
-    
     # Verify payment method
     payment_method = await PaymentMethod.find_one(
         PaymentMethod.id == payment_method_id,
@@ -336,43 +276,52 @@ async def withdraw_funds(
             detail="Payment method not found"
         )
     
-    # Create transaction
-    transaction = Transaction(
-        user_id=str(current_user.id),
-        wallet_id=str(wallet.id),
-        type=TransactionType.WITHDRAWAL,
-        amount=-amount,
-        description=f"Wallet withdrawal to {payment_method.name}",
-        payment_method_id=payment_method_id,
-        status=TransactionStatus.PENDING
-    )
-    await transaction.create()
-    
-    # Update wallet balance
-    wallet.balance -= amount
-    wallet.updated_at = datetime.utcnow()
-    await wallet.save()
+    # Debit guarded by balance >= amount, recorded with its transaction
+    try:
+        wallet, (transaction,) = await wallet_ledger_service.record(
+            str(current_user.id),
+            [{
+                "type": TransactionType.WITHDRAWAL,
+                "amount": -amount,
+                "description": f"Wallet withdrawal to {payment_method.name}",
+                "payment_method_id": payment_method_id,
+                "status": TransactionStatus.PENDING
+            }],
+            balance=-amount
+        )
+    except InsufficientFundsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     return {
         "message": "Withdrawal initiated",
         "transaction_id": str(transaction.id),
-        "new_balance": wallet.balance
+        "new_balance": wallet["balance"]
     }
 
 @router.get("/transactions")
 async def get_transactions(
     transaction_type: Optional[TransactionType] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's transaction history"""
+    """Get user's transaction history (pass next_cursor back as cursor for the next page)"""
     query = Transaction.find(Transaction.user_id == str(current_user.id))
     
     if transaction_type:
         query = query.find(Transaction.type == transaction_type)
     
-    transactions = await query.sort("-created_at").skip(offset).limit(limit).to_list()
+    try:
+        transactions, next_cursor = await fetch_page(query, "created_at", limit, cursor, offset)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     transaction_history = []
     for txn in transactions:
@@ -387,7 +336,7 @@ async def get_transactions(
             "completed_at": txn.completed_at.isoformat() if txn.completed_at else None
         })
     
-    return {"transactions": transaction_history}
+    return {"transactions": transaction_history, "next_cursor": next_cursor}
 
 @router.post("/payment-methods")
 async def add_payment_method(
@@ -466,28 +415,11 @@ async def get_available_rewards(
     current_user: User = Depends(get_current_user)
 ):
     """Get available rewards for redemption"""
-    query = RewardItem.find(RewardItem.is_active == True)
-    
-    if category:
-        query = query.find(RewardItem.category == category)
-    
-    rewards = await query.sort("points_required").to_list()
-    
-    # Get user's current points
-    wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-    user_points = wallet.points if wallet else 0
-    
-    reward_list = []
-    for reward in rewards:
-        reward_list.append({
-            "id": str(reward.id),
-            "name": reward.name,
-            "description": reward.description,
-            "points_required": reward.points_required,
-            "category": reward.category,
-            "image_url": reward.image_url,
-            "can_redeem": user_points >= reward.points_required
-        })
+    # Points come from the cached wallet summary and the catalogue from memory
+    summary = await wallet_ledger_service.get_summary(str(current_user.id))
+    user_points = summary.total_points
+    
+    reward_list = await reward_catalogue_service.get_rewards(user_points, category)
     
     return {"rewards": reward_list, "user_points": user_points}
 
@@ -509,44 +441,47 @@ async def redeem_reward(
             detail="Reward not found"
         )
     
-    # Get wallet
-    wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-    if not wallet or wallet.points < reward.points_required:
+    async def redeem(session):
+        # The id is allocated up front so the transaction can reference it
+        redemption = RewardRedemption(
+            id=PydanticObjectId(),
+            user_id=str(current_user.id),
+            reward_id=reward_id,
+            points_used=reward.points_required
+        )
+        
+        # Deduct points first (guarded by points >= cost) and record the
+        # transaction, so a failed debit never leaves a redemption behind
+        # even without a transaction
+        wallet, _ = await wallet_ledger_service.record(
+            str(current_user.id),
+            [{
+                "type": TransactionType.REWARD,
+                "points": -reward.points_required,
+                "description": f"Redeemed: {reward.name}",
+                "reference_id": str(redemption.id),
+                "status": TransactionStatus.COMPLETED,
+                "completed_at": datetime.utcnow()
+            }],
+            session=session,
+            points=-reward.points_required
+        )
+        
+        await redemption.insert(session=session)
+        return redemption, wallet
+    
+    try:
+        redemption, wallet = await run_in_transaction(redeem)
+    except InsufficientFundsError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Insufficient points"
+            detail=str(e)
         )
     
-    # Create redemption record
-    redemption = RewardRedemption(
-        user_id=str(current_user.id),
-        reward_id=reward_id,
-        points_used=reward.points_required
-    )
-    await redemption.create()
-    
-    # Create transaction
-    transaction = Transaction(
-        user_id=str(current_user.id),
-        wallet_id=str(wallet.id),
-        type=TransactionType.REWARD,
-        points=-reward.points_required,
-        description=f"Redeemed: {reward.name}",
-        reference_id=str(redemption.id),
-        status=TransactionStatus.COMPLETED,
-        completed_at=datetime.utcnow()
-    )
-    await transaction.create()
-    
-    # Update wallet points
-    wallet.points -= reward.points_required
-    wallet.updated_at = datetime.utcnow()
-    await wallet.save()
-    
     return {
         "message": "Reward redeemed successfully",
         "redemption_id": str(redemption.id),
-        "remaining_points": wallet.points
+        "remaining_points": wallet["points"]
     }
 
 @router.get("/tiers")
@@ -597,11 +532,9 @@ async def earn_points(
     current_user: User = Depends(get_current_user)
 ):
     """Earn points from booking (internal API)"""
-    # Get wallet
-    wallet = await Wallet.find_one(Wallet.user_id == str(current_user.id))
-    if not wallet:
-        wallet = Wallet(user_id=str(current_user.id))
-        await wallet.create()
+    # Current tier decides the multiplier and cashback rate
+    summary = await wallet_ledger_service.get_summary(str(current_user.id))
+    membership_tier = MembershipTier(summary.membership_tier)
     
     # Calculate points (1 point per $2 spent)
     points_earned = int(amount / 2)
@@ -614,7 +547,7 @@ async def earn_points(
         MembershipTier.PLATINUM: 3.0
     }
     
-    multiplier = tier_multipliers.get(wallet.membership_tier, 1.0)
+    multiplier = tier_multipliers.get(membership_tier, 1.0)
     points_earned = int(points_earned * multiplier)
     
     # Calculate cashback
@@ -625,56 +558,30 @@ async def earn_points(
         MembershipTier.PLATINUM: 0.05
     }
     
-    cashback_rate = cashback_rates.get(wallet.membership_tier, 0.01)
+    cashback_rate = cashback_rates.get(membership_tier, 0.01)
     cashback_amount = amount * cashback_rate
     
-    # Create points transaction
-    points_transaction = Transaction(
-        user_id=str(current_user.id),
-        wallet_id=str(wallet.id),
-        type=TransactionType.POINTS,
-        points=points_earned,
-        description=f"Points earned: {description}",
-        reference_id=booking_id,
-        status=TransactionStatus.COMPLETED,
-        completed_at=datetime.utcnow()
-    )
-    await points_transaction.create()
-    
-    # Create cashback transaction
-    cashback_transaction = Transaction(
-        user_id=str(current_user.id),
-        wallet_id=str(wallet.id),
-        type=TransactionType.CASHBACK,
-        amount=cashback_amount,
-        description=f"Cashback: {description}",
-        reference_id=booking_id,
-        status=TransactionStatus.COMPLETED,
-        completed_at=datetime.utcnow()
+    # The wallet is credited in the background; an earn for a booking is
+    # recorded once however often it is retried
+    event = await event_queue_service.publish(
+        POINTS_EARNED,
+        {
+            "user_id": str(current_user.id),
+            "points": points_earned,
+            "cashback": cashback_amount,
+            "description": description,
+            "booking_id": booking_id
+        },
+        idempotency_key=f"{POINTS_EARNED}:{current_user.id}:{booking_id}" if booking_id else None
     )
-    await cashback_transaction.create()
-    
-    # Update wallet
-    wallet.points += points_earned
-    wallet.tier_points += points_earned
-    wallet.total_cashback += cashback_amount
-    wallet.balance += cashback_amount
-    wallet.updated_at = datetime.utcnow()
-    
-    # Check for tier upgrade
-    if wallet.tier_points >= 30000 and wallet.membership_tier != MembershipTier.PLATINUM:
-        wallet.membership_tier = MembershipTier.PLATINUM
-    elif wallet.tier_points >= 15000 and wallet.membership_tier not in [MembershipTier.GOLD, MembershipTier.PLATINUM]:
-        wallet.membership_tier = MembershipTier.GOLD
-    elif wallet.tier_points >= 5000 and wallet.membership_tier == MembershipTier.BRONZE:
-        wallet.membership_tier = MembershipTier.SILVER
-    
-    await wallet.save()
     
+    # Totals are projected from the summary until the event is applied
     return {
-        "points_earned": points_earned,
-        "cashback_earned": cashback_amount,
-        "new_tier": wallet.membership_tier.value,
-        "total_points": wallet.points,
-        "total_balance": wallet.balance
+        "points_earned": event.payload["points"],
+        "cashback_earned": event.payload["cashback"],
+        "new_tier": summary.membership_tier,
+        "total_points": summary.total_points + event.payload["points"],
+        "total_balance": summary.total_balance + event.payload["cashback"],
+        "status": "queued",
+        "event_id": str(event.id)
     }
\ No newline at end of file
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from ..config import settings
+from ..models.outbox import OutboxEvent, OutboxStatus, AppliedEvent
+from ..mongodb_database import run_in_transaction, release_applied_events
+
+logger = logging.getLogger(__name__)
+
+# Handlers receive a batch of raw outbox events of one type and the session to write with
+EventHandler = Callable[[List[Dict[str, Any]], Any], Awaitable[None]]
+
+# How long a worker owns a claimed event before another worker may take it over
+LEASE_SECONDS = 60
+
+
+def _claimable(now: datetime) -> Dict[str, Any]:
+    return {
+        "$or": [
+            {"status": OutboxStatus.PENDING.value, "available_at": {"$lte": now}},
+            {"status": OutboxStatus.PROCESSING.value, "lease_expires_at": {"$lt": now}}
+        ]
+    }
+
+
+class EventQueueService:
+    """
+    In-process job queue backed by a persistent outbox collection
+
+    ``publish`` records one OutboxEvent, deduplicated by its idempotency key,
+    and pushes its id onto an asyncio queue. A pool of workers drains the
+    queue in batches, claims the events with a lease and hands each event
+    type's batch to its registered handler, which writes the whole batch
+    with bulk operations. The handler's writes and the "done" mark share a
+    transaction where the deployment supports one. A standalone server
+    delivers at least once: a batch that failed partway, or whose worker
+    died before marking it done, runs again. Handlers therefore apply each
+    event once per target document through ``apply_once``.
+
+    A poller re-queues whatever the in-memory queue does not hold: events
+    left over from a restart, retries after a failure and expired leases.
+    It also releases the applied-event guards of settled events.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.EVENT_QUEUE_WORKERS,
+        batch_size: int = settings.EVENT_QUEUE_BATCH_SIZE,
+        poll_seconds: float = settings.EVENT_QUEUE_POLL_SECONDS,
+        max_attempts: int = settings.EVENT_QUEUE_MAX_ATTEMPTS
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, EventHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def handler(self, event_type: str):
+        """
+        Register the batch handler for an event type
+        """
+        def register(handler: EventHandler) -> EventHandler:
+            self._handlers[event_type] = handler
+            return handler
+        return register
+
+    async def publish(
+        self,
+        event_type: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None
+    ) -> OutboxEvent:
+        """
+        Record an event for background processing
+
+        Args:
+            event_type: Registered handler name
+            payload: JSON-serializable event data
+            idempotency_key: Key identifying the event; publishing the same key
+                again returns the stored event instead of a duplicate
+
+        Returns:
+            The stored outbox event
+        """
+        event = OutboxEvent(
+            event_type=event_type,
+            payload=payload,
+            idempotency_key=idempotency_key or f"{event_type}:{uuid.uuid4().hex}"
+        )
+        try:
+            await event.insert()
+        except DuplicateKeyError:
+            return await OutboxEvent.find_one(OutboxEvent.idempotency_key == event.idempotency_key)
+
+        if self._queue is not None:
+            self._queue.put_nowait(event.id)
+        return event
+
+    async def _claim(self, ids: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Take a lease on the claimable events among ``ids``
+        """
+        lease = uuid.uuid4().hex
+        now = datetime.utcnow()
+        collection = OutboxEvent.get_motor_collection()
+        await collection.update_many(
+            {"_id": {"$in": ids}, **_claimable(now)},
+            {
+                "$set": {
+                    "status": OutboxStatus.PROCESSING.value,
+                    "lease": lease,
+                    "lease_expires_at": now + timedelta(seconds=LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            }
+        )
+        # The $type clause lets the planner use the partial lease index
+        return await collection.find({"lease": {"$eq": lease, "$type": "string"}}).to_list(length=None)
+
+    async def _apply(self, handler: EventHandler, events: List[Dict[str, Any]]) -> None:
+        collection = OutboxEvent.get_motor_collection()
+
+        async def apply(session):
+            await handler(events, session)
+            await collection.update_many(
+                {"_id": {"$in": [event["_id"] for event in events]}, "lease": events[0]["lease"]},
+                {
+                    "$set": {"status": OutboxStatus.DONE.value, "processed_at": datetime.utcnow()},
+                    "$unset": {"lease": "", "lease_expires_at": ""}
+                },
+                session=session
+            )
+
+        await run_in_transaction(apply)
+
+    async def _release(self, events: List[Dict[str, Any]], error: Exception) -> None:
+        """
+        Return failed events for a later retry, or park them once out of attempts
+        """
+        now = datetime.utcnow()
+        collection = OutboxEvent.get_motor_collection()
+        for event in events:
+            if event["attempts"] >= self.max_attempts:
+                update = {"status": OutboxStatus.FAILED.value}
+                logger.error(f"Outbox event {event['_id']} ({event['event_type']}) failed permanently: {str(error)}")
+            else:
+                update = {
+                    "status": OutboxStatus.PENDING.value,
+                    "available_at": now + timedelta(seconds=2 ** event["attempts"])
+                }
+            await collection.update_one(
+                {"_id": event["_id"], "lease": event["lease"]},
+                {"$set": {**update, "last_error": str(error)}, "$unset": {"lease": "", "lease_expires_at": ""}}
+            )
+
+    async def _process(self, events: List[Dict[str, Any]]) -> None:
+        by_type: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for event in events:
+            by_type[event["event_type"]].append(event)
+
+        for event_type, batch in by_type.items():
+            handler = self._handlers.get(event_type)
+            if handler is None:
+                await self._release(batch, LookupError(f"No handler registered for {event_type}"))
+                continue
+
+            try:
+                await self._apply(handler, batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    await self._release(batch, e)
+                    continue
+                # Retry one by one so a single bad event cannot hold back the
+                # rest; safe because handlers skip events already applied
+                for event in batch:
+                    try:
+                        await self._apply(handler, [event])
+                    except Exception as event_error:
+                        await self._release([event], event_error)
+
+    async def _worker(self) -> None:
+        while True:
+            ids = [await self._queue.get()]
+            while len(ids) < self.batch_size and not self._queue.empty():
+                ids.append(self._queue.get_nowait())
+
+            try:
+                events = await self._claim(ids)
+                if events:
+                    await self._process(events)
+            except Exception as e:
+                logger.error(f"Event queue worker error: {str(e)}")
+
+    async def _release_settled(self) -> None:
+        """
+        Release the applied-event guards of events that can no longer run again
+        """
+        # A lease past its expiry means no worker still holds the event
+        cutoff = datetime.utcnow() - timedelta(seconds=LEASE_SECONDS)
+        markers = await AppliedEvent.get_motor_collection().find(
+            {"released": False, "created_at": {"$lt": cutoff}}, {"event_id": 1}
+        ).limit(self.batch_size * self.workers).to_list(length=None)
+        event_ids = {ObjectId(marker["event_id"]) for marker in markers if ObjectId.is_valid(marker["event_id"])}
+        if not event_ids:
+            return
+
+        settled = await OutboxEvent.get_motor_collection().find(
+            {"_id": {"$in": list(event_ids)}, "status": {"$in": [OutboxStatus.DONE.value, OutboxStatus.FAILED.value]}},
+            {"_id": 1}
+        ).to_list(length=None)
+        if settled:
+            await release_applied_events([str(event["_id"]) for event in settled])
+
+    async def _poll_loop(self) -> None:
+        while True:
+            # Only top up an idle queue; anything already queued is claimed soon anyway
+            if self._queue.empty():
+                try:
+                    rows = await OutboxEvent.get_motor_collection().find(
+                        _claimable(datetime.utcnow()), {"_id": 1}
+                    ).sort("available_at", 1).limit(self.batch_size * self.workers).to_list(length=None)
+                    for row in rows:
+                        self._queue.put_nowait(row["_id"])
+                except Exception as e:
+                    logger.error(f"Event queue poll error: {str(e)}")
+            try:
+                await self._release_settled()
+            except Exception as e:
+                logger.error(f"Event queue release error: {str(e)}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def start(self) -> None:
+        """
+        Start the worker pool and the outbox poller
+        """
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._poll_loop()))
+
+    async def stop(self) -> None:
+        """
+        Stop the workers; unfinished events stay in the outbox for the next start
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+
+# Initialize the event queue service
+event_queue_service = EventQueueService()
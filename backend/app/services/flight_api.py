@@ -8,6 +8,7 @@ import asyncio
 from typing import Dict, List, Optional, Any
 from datetime import datetime, date
 from ..config import settings
+from .supplier_logging import log_supplier_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -919,8 +920,6 @@ class FlightAPIService:
                 "paxInfo": passenger_info
             }
             
-            logger.info(f"Booking flight with payload: {payload}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
@@ -929,8 +928,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Booking API response status: {response.status_code}")
-                logger.info(f"Booking API response: {response.text}")
+                log_supplier_response("flight_booking", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -1128,8 +1126,6 @@ class FlightAPIService:
                 "fare_source_code": fare_source_code
             }
             
-            logger.info(f"Getting extra services with payload: {payload}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
@@ -1138,8 +1134,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Extra services API response status: {response.status_code}")
-                logger.info(f"Extra services API response: {response.text}")
+                log_supplier_response("extra_services", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -1439,8 +1434,6 @@ class FlightAPIService:
             if fare_source_code_inbound:
                 payload["fare_source_code_inbound"] = fare_source_code_inbound
             
-            logger.info(f"Getting fare rules with payload: {payload}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
@@ -1449,8 +1442,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Fare rules API response status: {response.status_code}")
-                logger.info(f"Fare rules API response: {response.text}")
+                log_supplier_response("fare_rules", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -1759,8 +1751,6 @@ class FlightAPIService:
                 "UniqueID": unique_id
             }
             
-            logger.info(f"Getting trip details for booking: {unique_id}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
@@ -1769,8 +1759,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Trip details API response status: {response.status_code}")
-                logger.info(f"Trip details API response: {response.text}")
+                log_supplier_response("trip_details", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -2186,8 +2175,6 @@ class FlightAPIService:
                 "UniqueID": unique_id
             }
             
-            logger.info(f"Ordering ticket for booking: {unique_id}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
@@ -2196,8 +2183,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Ticket order API response status: {response.status_code}")
-                logger.info(f"Ticket order API response: {response.text}")
+                log_supplier_response("ticket_order", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -2313,8 +2299,6 @@ class FlightAPIService:
                 "UniqueID": unique_id
             }
             
-            logger.info(f"Cancelling booking: {unique_id}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
@@ -2323,8 +2307,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Cancel booking API response status: {response.status_code}")
-                logger.info(f"Cancel booking API response: {response.text}")
+                log_supplier_response("flight_cancellation", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -2423,8 +2406,6 @@ class FlightAPIService:
                 "ip_address": self.ip_address
             }
             
-            logger.info("Getting airport list from API")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for reference data
                 response = await client.post(
@@ -2433,7 +2414,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Airport list API response status: {response.status_code}")
+                log_supplier_response("airport_list", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -2526,8 +2507,6 @@ class FlightAPIService:
                 "ip_address": self.ip_address
             }
             
-            logger.info("Getting airline list from API")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for reference data
                 response = await client.post(
@@ -2536,7 +2515,7 @@ class FlightAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Airline list API response status: {response.status_code}")
+                log_supplier_response("airline_list", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from pymongo.errors import DuplicateKeyError
+from ..models.franchise import (
+    FranchiseBooking, FranchiseDailyRollup, FranchiseRollupLock, ROLLUP_REBUILD_LOCK_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Time for booking writes already past the lock check to land before the rebuild reads bookings
+ROLLUP_REBUILD_GRACE_SECONDS = 2
+
+
+class RollupRebuildInProgressError(Exception):
+    pass
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def is_day_start(moment: Optional[datetime]) -> bool:
+    return moment is None or moment == moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _revenue_group() -> Dict[str, Any]:
+    return {"_id": None, "revenue": {"$sum": "$revenue"}, "bookings": {"$sum": "$bookings"}}
+
+
+class FranchiseAnalyticsService:
+    """
+    Franchise booking analytics served from daily rollups
+
+    ``franchise_daily_rollups`` holds one row per day, partner, destination
+    and booking type. FranchiseBooking event hooks keep it current on insert,
+    save, replace and delete, and ``rebuild_rollups`` backfills it from raw
+    bookings. Dashboards aggregate a few hundred rollup rows instead of the
+    booking history.
+
+    A rebuild holds FranchiseRollupLock while it runs. Booking writes wait
+    for the lock and hooks skip rollup increments under it, so nothing is
+    lost when ``$out`` swaps the new rows in. Query-level booking writes
+    bypass the hooks and need a rebuild afterwards.
+    """
+
+    async def _aggregate_one(self, collection, pipeline: list) -> Dict[str, Any]:
+        rows = await collection.aggregate(pipeline).to_list(length=1)
+        return rows[0] if rows else {}
+
+    async def rebuild_rollups(self) -> int:
+        """
+        Recompute every daily rollup row from franchise bookings
+
+        Returns:
+            Number of rollup rows written
+
+        Raises:
+            RollupRebuildInProgressError: If another rebuild holds the lock
+        """
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=ROLLUP_REBUILD_LOCK_SECONDS)
+        locks = FranchiseRollupLock.get_motor_collection()
+        try:
+            await locks.update_one(
+                {"name": FranchiseRollupLock.REBUILD, "locked_until": {"$lte": now}},
+                {"$set": {"locked_until": locked_until}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            raise RollupRebuildInProgressError("A franchise rollup rebuild is already running")
+
+        try:
+            await asyncio.sleep(ROLLUP_REBUILD_GRACE_SECONDS)
+            await self._aggregate_rollups()
+        finally:
+            # Matching our own expiry leaves a lock a later rebuild took over alone
+            await locks.update_one(
+                {"name": FranchiseRollupLock.REBUILD, "locked_until": locked_until},
+                {"$set": {"locked_until": datetime.utcnow()}}
+            )
+
+        count = await FranchiseDailyRollup.count()
+        logger.info(f"Rebuilt {count} franchise daily rollup rows")
+        return count
+
+    async def _aggregate_rollups(self) -> None:
+        await FranchiseBooking.get_motor_collection().aggregate([
+            {"$group": {
+                "_id": {
+                    "date": {"$dateTrunc": {"date": "$booking_date", "unit": "day"}},
+                    "partner_id": "$partner_id",
+                    "destination": "$destination",
+                    "booking_type": "$booking_type"
+                },
+                "bookings": {"$sum": 1},
+                "revenue": {"$sum": "$amount"},
+                "commission": {"$sum": "$commission_amount"}
+            }},
+            {"$project": {
+                "_id": 0,
+                "date": "$_id.date",
+                "partner_id": "$_id.partner_id",
+                "destination": "$_id.destination",
+                "booking_type": "$_id.booking_type",
+                "bookings": 1,
+                "revenue": 1,
+                "commission": 1
+            }},
+            # $out swaps the collection in atomically and keeps its indexes
+            {"$out": FranchiseDailyRollup.get_motor_collection().name}
+        ]).to_list(length=None)
+
+    async def ensure_rollups(self) -> None:
+        """
+        Backfill rollups on first start after they were introduced
+        """
+        if await FranchiseDailyRollup.find_one() is None and await FranchiseBooking.find_one() is not None:
+            try:
+                await self.rebuild_rollups()
+            except RollupRebuildInProgressError:
+                logger.info("Franchise rollup backfill already running in another worker")
+
+    async def get_booking_summary(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Booking totals, month-over-month revenue growth and top destinations
+
+        Returns:
+            Dict with total_bookings, total_revenue, monthly_growth and top_destinations
+        """
+        current_month = month_start(now or datetime.utcnow())
+        last_month = month_start(current_month - timedelta(days=1))
+
+        result = await self._aggregate_one(FranchiseDailyRollup.get_motor_collection(), [
+            {"$facet": {
+                "totals": [{"$group": _revenue_group()}],
+                "current_month": [
+                    {"$match": {"date": {"$gte": current_month}}},
+                    {"$group": _revenue_group()}
+                ],
+                "last_month": [
+                    {"$match": {"date": {"$gte": last_month, "$lt": current_month}}},
+                    {"$group": _revenue_group()}
+                ],
+                "top_destinations": [
+                    {"$group": {"_id": "$destination", "bookings": {"$sum": "$bookings"}}},
+                    {"$match": {"bookings": {"$gt": 0}}},
+                    {"$sort": {"bookings": -1, "_id": 1}},
+                    {"$limit": 5}
+                ]
+            }}
+        ])
+
+        totals = (result.get("totals") or [{}])[0]
+        current_revenue = (result.get("current_month") or [{}])[0].get("revenue", 0)
+        last_revenue = (result.get("last_month") or [{}])[0].get("revenue", 0)
+
+        return {
+            "total_bookings": totals.get("bookings", 0),
+            "total_revenue": totals.get("revenue", 0),
+            "monthly_growth": ((current_revenue - last_revenue) / last_revenue * 100) if last_revenue > 0 else 0,
+            "top_destinations": [
+                {"destination": row["_id"], "bookings": row["bookings"]}
+                for row in result.get("top_destinations", [])
+            ]
+        }
+
+    async def get_revenue_analytics(
+        self,
+        partner_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Revenue and booking counts per month, plus totals, for a date range
+
+        Day-aligned ranges (the usual date picker case) are read from the
+        daily rollups, with ``end_date`` covering that whole day. Ranges with
+        a time of day fall back to aggregating raw bookings.
+
+        Args:
+            partner_id: Restrict to one franchise partner
+            start_date: Earliest booking date (inclusive)
+            end_date: Latest booking date (inclusive)
+        """
+        use_rollups = is_day_start(start_date) and is_day_start(end_date)
+        date_field = "date" if use_rollups else "booking_date"
+
+        match: Dict[str, Any] = {}
+        if partner_id:
+            match["partner_id"] = partner_id
+        if start_date or end_date:
+            match[date_field] = {}
+            if start_date:
+                match[date_field]["$gte"] = start_date
+            if end_date:
+                match[date_field]["$lte"] = end_date
+
+        if use_rollups:
+            collection = FranchiseDailyRollup.get_motor_collection()
+            revenue, bookings = "$revenue", "$bookings"
+        else:
+            collection = FranchiseBooking.get_motor_collection()
+            revenue, bookings = "$amount", 1
+
+        result = await self._aggregate_one(collection, [
+            {"$match": match},
+            {"$facet": {
+                "monthly": [
+                    {"$group": {
+                        "_id": {"$dateToString": {"format": "%Y-%m", "date": f"${date_field}"}},
+                        "revenue": {"$sum": revenue},
+                        "bookings": {"$sum": bookings}
+                    }},
+                    {"$match": {"bookings": {"$gt": 0}}},
+                    {"$sort": {"_id": 1}}
+                ],
+                "totals": [{"$group": {"_id": None, "revenue": {"$sum": revenue}, "bookings": {"$sum": bookings}}}]
+            }}
+        ])
+
+        totals = (result.get("totals") or [{}])[0]
+        total_revenue = totals.get("revenue", 0)
+        total_bookings = totals.get("bookings", 0)
+
+        return {
+            "monthly_data": {
+                row["_id"]: {"revenue": row["revenue"], "bookings": row["bookings"]}
+                for row in result.get("monthly", [])
+            },
+            "total_revenue": total_revenue,
+            "total_bookings": total_bookings,
+            "average_booking_value": total_revenue / total_bookings if total_bookings else 0
+        }
+
+
+# Initialize the franchise analytics service
+franchise_analytics_service = FranchiseAnalyticsService()
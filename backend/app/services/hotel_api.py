@@ -1,12 +1,64 @@
+import asyncio
 import httpx
 import logging
-from typing import Dict, Any, List, Optional
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Set
 from ..config import settings
+from .cache import TTLCache
+from .supplier_logging import log_supplier_response
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Facility keywords per category, in match priority order. A facility that
+# matches keywords from several categories goes to the first one listed.
+FACILITY_CATEGORY_KEYWORDS = {
+    "connectivity": ["wifi", "wlan", "internet", "wireless"],
+    "dining": ["restaurant", "bar", "cafe", "dining", "breakfast", "room service"],
+    "business": ["conference", "meeting", "business", "boardroom"],
+    "leisure": ["pool", "gym", "spa", "fitness", "casino", "games", "theatre", "nightclub"],
+    "services": ["laundry", "concierge", "reception", "room service", "housekeeping", "medical"],
+    "transportation": ["parking", "car park", "garage", "valet"],
+}
+FACILITY_CATEGORY_ORDER = list(FACILITY_CATEGORY_KEYWORDS) + ["other"]
+
+# Top-level fields of a normalized hotel search/filter result, selectable
+# through the ``fields`` parameter of the list endpoints
+HOTEL_RESULT_FIELDS = (
+    "hotel_id", "twx_hotel_id", "product_id", "token_id", "hotel_name",
+    "address", "city", "locality", "country", "postal_code", "coordinates",
+    "contact", "rating", "pricing", "property_details", "media", "facilities",
+    "amenities_count", "booking_info", "display"
+)
+
+_FACILITY_KEYWORD_PRIORITY: Dict[str, int] = {}
+for _priority, _keywords in enumerate(FACILITY_CATEGORY_KEYWORDS.values()):
+    for _keyword in _keywords:
+        _FACILITY_KEYWORD_PRIORITY.setdefault(_keyword, _priority)
+
+# One alternation for every keyword, wrapped in a lookahead so overlapping
+# matches at each position are all seen. Keywords are listed by priority so
+# the best category wins when several keywords start at the same position.
+_FACILITY_KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(
+        re.escape(keyword)
+        for keyword in sorted(_FACILITY_KEYWORD_PRIORITY, key=lambda k: (_FACILITY_KEYWORD_PRIORITY[k], -len(k)))
+    ) + "))"
+)
+
+
+@lru_cache(maxsize=4096)
+def _facility_category(facility: str) -> str:
+    """
+    Resolve the category for a single facility string (memoized)
+    """
+    best = len(FACILITY_CATEGORY_KEYWORDS)
+    for match in _FACILITY_KEYWORD_PATTERN.finditer(facility.lower()):
+        best = min(best, _FACILITY_KEYWORD_PRIORITY[match.group(1)])
+        if best == 0:
+            break
+    return FACILITY_CATEGORY_ORDER[best]
+
 class HotelAPIService:
     """
     Service class for TravelNext Hotel API integration
@@ -28,6 +80,33 @@ class HotelAPIService:
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        # Shared connection pool and concurrency governor for supplier calls
+        self._client: Optional[httpx.AsyncClient] = None
+        self._governor = asyncio.Semaphore(settings.HOTEL_API_MAX_CONCURRENCY)
+        # Room rates per session, hotel offer, dates and occupancy, kept for the session lifetime
+        self._room_rates_cache = TTLCache(ttl_seconds=settings.HOTEL_SESSION_TTL_SECONDS, max_entries=5000)
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared HTTP client, creating it on first use
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=60.0,
+                limits=httpx.Limits(
+                    max_connections=settings.HOTEL_API_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.HOTEL_API_MAX_CONCURRENCY
+                )
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """
+        Close the shared HTTP client
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def search_hotels(
         self,
@@ -45,7 +124,8 @@ class HotelAPIService:
         hotel_codes: List[str] = None,
         radius: int = 20,
         max_result: int = 25,
-        results_per_page: int = None
+        results_per_page: int = None,
+        fields: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
         """
         Search for hotel availability using TravelNext Hotel API v6
@@ -66,6 +146,7 @@ class HotelAPIService:
             radius: Radius from center in KM
             max_result: Maximum number of results required
             results_per_page: Results per page for pagination
+            fields: Top-level hotel fields to build (all fields when None)
             
         Returns:
             Dict containing hotel search results
@@ -124,8 +205,6 @@ class HotelAPIService:
             if hotel_codes:
                 payload["hotelCodes"] = hotel_codes[:1000]  # Maximum 1000 hotel codes
             
-            logger.info(f"Searching hotels with payload: {payload}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.post(
@@ -134,8 +213,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Hotel search API response status: {response.status_code}")
-                logger.info(f"Hotel search API response: {response.text}")
+                log_supplier_response("hotel_search", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -145,7 +223,7 @@ class HotelAPIService:
                     }
                 
                 api_response = response.json()
-                return self._process_hotel_search_response(api_response)
+                return self._process_hotel_search_response(api_response, fields)
                 
         except httpx.TimeoutException:
             logger.error("Hotel search API timeout")
@@ -162,7 +240,7 @@ class HotelAPIService:
                 "hotels": []
             }
     
-    def _process_hotel_search_response(self, api_response: Dict[str, Any]) -> Dict[str, Any]:
+    def _process_hotel_search_response(self, api_response: Dict[str, Any], fields: Optional[Set[str]] = None) -> Dict[str, Any]:
         """
         Process and normalize the hotel search API response
         """
@@ -199,7 +277,7 @@ class HotelAPIService:
             # Process and normalize hotel data
             normalized_hotels = []
             for hotel_data in itineraries:
-                normalized_hotel = self._normalize_hotel_data(hotel_data)
+                normalized_hotel = self._normalize_hotel_data(hotel_data, fields)
                 normalized_hotels.append(normalized_hotel)
             
             return {
@@ -223,72 +301,71 @@ class HotelAPIService:
                 "hotels": []
             }
     
-    def _normalize_hotel_data(self, hotel_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _normalize_hotel_data(self, hotel_data: Dict[str, Any], fields: Optional[Set[str]] = None) -> Dict[str, Any]:
         """
         Normalize individual hotel data from API response
+        
+        Only the top-level fields listed in ``fields`` are built (``hotel_id``
+        is always included); all fields are built when ``fields`` is None.
         """
         try:
+            fare_type = hotel_data.get("fareType", "")
+            facilities = hotel_data.get("facilities", [])
+            is_refundable = fare_type.lower() == "refundable"
+            
             # Extract and normalize hotel information
-            normalized_hotel = {
-                "hotel_id": hotel_data.get("hotelId", ""),
-                "twx_hotel_id": hotel_data.get("twxHotelId", ""),
-                "product_id": hotel_data.get("productId", ""),
-                "token_id": hotel_data.get("tokenId", ""),
-                "hotel_name": hotel_data.get("hotelName", ""),
-                "address": hotel_data.get("address", ""),
-                "city": hotel_data.get("city", ""),
-                "locality": hotel_data.get("locality", ""),
-                "country": hotel_data.get("country", ""),
-                "postal_code": hotel_data.get("postalCode"),
-                "coordinates": {
+            builders = {
+                "hotel_id": lambda: hotel_data.get("hotelId", ""),
+                "twx_hotel_id": lambda: hotel_data.get("twxHotelId", ""),
+                "product_id": lambda: hotel_data.get("productId", ""),
+                "token_id": lambda: hotel_data.get("tokenId", ""),
+                "hotel_name": lambda: hotel_data.get("hotelName", ""),
+                "address": lambda: hotel_data.get("address", ""),
+                "city": lambda: hotel_data.get("city", ""),
+                "locality": lambda: hotel_data.get("locality", ""),
+                "country": lambda: hotel_data.get("country", ""),
+                "postal_code": lambda: hotel_data.get("postalCode"),
+                "coordinates": lambda: {
                     "latitude": hotel_data.get("latitude"),
                     "longitude": hotel_data.get("longitude")
                 },
-                "contact": {
+                "contact": lambda: {
                     "phone": hotel_data.get("phone"),
                     "email": hotel_data.get("email")
                 },
-                "rating": {
-                    "hotel_rating": hotel_data.get("hotelRating"),
-                    "trip_advisor_rating": hotel_data.get("tripAdvisorRating"),
-                    "trip_advisor_review_count": hotel_data.get("tripAdvisorReview")
-                },
-                "pricing": {
+                "rating": lambda: self._normalize_hotel_rating(hotel_data),
+                "pricing": lambda: {
                     "total": hotel_data.get("total", 0),
                     "currency": hotel_data.get("currency", ""),
-                    "fare_type": hotel_data.get("fareType", "")
+                    "fare_type": fare_type
                 },
-                "property_details": {
+                "property_details": lambda: {
                     "property_type": hotel_data.get("propertyType", ""),
                     "distance_from_center": {
                         "value": hotel_data.get("distanceValue"),
                         "unit": hotel_data.get("distanceUnit", "KM")
                     }
                 },
-                "media": {
+                "media": lambda: {
                     "thumbnail_url": hotel_data.get("thumbNailUrl"),
                     "image_count": 1 if hotel_data.get("thumbNailUrl") else 0
                 },
-                "facilities": hotel_data.get("facilities", []),
-                "amenities_count": len(hotel_data.get("facilities", [])),
-                "booking_info": {
-                    "is_refundable": hotel_data.get("fareType", "").lower() == "refundable",
-                    "cancellation_policy": "Free cancellation" if hotel_data.get("fareType", "").lower() == "refundable" else "Non-refundable"
-                }
+                "facilities": lambda: facilities,
+                "amenities_count": lambda: len(facilities),
+                "booking_info": lambda: {
+                    "is_refundable": is_refundable,
+                    "cancellation_policy": "Free cancellation" if is_refundable else "Non-refundable"
+                },
+                # Add display fields for frontend
+                "display": lambda: self._build_hotel_display(hotel_data)
             }
             
-            # Add display fields for frontend
-            normalized_hotel["display"] = {
-                "name_with_rating": f"{normalized_hotel['hotel_name']} ({normalized_hotel['rating']['hotel_rating']}★)" if normalized_hotel['rating']['hotel_rating'] else normalized_hotel['hotel_name'],
-                "location_summary": f"{normalized_hotel['locality']}, {normalized_hotel['city']}" if normalized_hotel['locality'] else normalized_hotel['city'],
-                "price_summary": f"{normalized_hotel['pricing']['currency']} {normalized_hotel['pricing']['total']:.2f}",
-                "distance_summary": f"{normalized_hotel['property_details']['distance_from_center']['value']} {normalized_hotel['property_details']['distance_from_center']['unit']} from center" if normalized_hotel['property_details']['distance_from_center']['value'] else "",
-                "amenities_summary": f"{normalized_hotel['amenities_count']} amenities available",
-                "rating_summary": self._format_rating_summary(normalized_hotel['rating'])
+            return {
+                field: build()
+                for field, build in builders.items()
+                if fields is None or field == "hotel_id" or field in fields
             }
             
-            return normalized_hotel
-            
         except Exception as e:
             logger.error(f"Error normalizing hotel data: {str(e)}")
             # Return minimal hotel data if normalization fails
@@ -298,6 +375,35 @@ class HotelAPIService:
                 "error": f"Normalization failed: {str(e)}"
             }
     
+    def _normalize_hotel_rating(self, hotel_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalize rating information from a hotel search itinerary
+        """
+        return {
+            "hotel_rating": hotel_data.get("hotelRating"),
+            "trip_advisor_rating": hotel_data.get("tripAdvisorRating"),
+            "trip_advisor_review_count": hotel_data.get("tripAdvisorReview")
+        }
+    
+    def _build_hotel_display(self, hotel_data: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Build the formatted display block for a hotel search itinerary
+        """
+        hotel_name = hotel_data.get("hotelName", "")
+        hotel_rating = hotel_data.get("hotelRating")
+        locality = hotel_data.get("locality", "")
+        city = hotel_data.get("city", "")
+        distance_value = hotel_data.get("distanceValue")
+        
+        return {
+            "name_with_rating": f"{hotel_name} ({hotel_rating}★)" if hotel_rating else hotel_name,
+            "location_summary": f"{locality}, {city}" if locality else city,
+            "price_summary": f"{hotel_data.get('currency', '')} {hotel_data.get('total', 0):.2f}",
+            "distance_summary": f"{distance_value} {hotel_data.get('distanceUnit', 'KM')} from center" if distance_value else "",
+            "amenities_summary": f"{len(hotel_data.get('facilities', []))} amenities available",
+            "rating_summary": self._format_rating_summary(self._normalize_hotel_rating(hotel_data))
+        }
+    
     def _format_rating_summary(self, rating_data: Dict[str, Any]) -> str:
         """
         Format rating information for display
@@ -320,7 +426,8 @@ class HotelAPIService:
         self,
         session_id: str,
         next_token: str,
-        max_result: int = 20
+        max_result: int = 20,
+        fields: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
         """
         Get more hotel search results using session ID and next token
@@ -329,6 +436,7 @@ class HotelAPIService:
             session_id: Session ID from previous hotel search
             next_token: Token for retrieving next set of results
             max_result: Maximum number of results to return
+            fields: Top-level hotel fields to build (all fields when None)
             
         Returns:
             Dict containing additional hotel search results
@@ -341,8 +449,6 @@ class HotelAPIService:
                 "maxResult": max_result
             }
             
-            logger.info(f"Getting more hotel results with params: {params}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.get(
@@ -351,8 +457,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"More hotel results API response status: {response.status_code}")
-                logger.info(f"More hotel results API response: {response.text}")
+                log_supplier_response("more_results", response, params)
                 
                 if response.status_code != 200:
                     return {
@@ -362,7 +467,7 @@ class HotelAPIService:
                     }
                 
                 api_response = response.json()
-                return self._process_hotel_search_response(api_response)
+                return self._process_hotel_search_response(api_response, fields)
                 
         except httpx.TimeoutException:
             logger.error("More hotel results API timeout")
@@ -382,7 +487,8 @@ class HotelAPIService:
     async def get_more_hotel_results_pagination(
         self,
         session_id: str,
-        next_token: str
+        next_token: str,
+        fields: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
         """
         Get more hotel search results using pagination (no maxResult limit)
@@ -390,6 +496,7 @@ class HotelAPIService:
         Args:
             session_id: Session ID from previous hotel search
             next_token: Token for retrieving next set of results
+            fields: Top-level hotel fields to build (all fields when None)
             
         Returns:
             Dict containing additional hotel search results with pagination
@@ -401,8 +508,6 @@ class HotelAPIService:
                 "nextToken": next_token
             }
             
-            logger.info(f"Getting more hotel results (pagination) with params: {params}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.get(
@@ -411,8 +516,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"More hotel results pagination API response status: {response.status_code}")
-                logger.info(f"More hotel results pagination API response: {response.text}")
+                log_supplier_response("more_results_pagination", response, params)
                 
                 if response.status_code != 200:
                     return {
@@ -422,7 +526,7 @@ class HotelAPIService:
                     }
                 
                 api_response = response.json()
-                return self._process_hotel_search_response(api_response)
+                return self._process_hotel_search_response(api_response, fields)
                 
         except httpx.TimeoutException:
             logger.error("More hotel results pagination API timeout")
@@ -452,7 +556,8 @@ class HotelAPIService:
         property_type: str = None,
         facility: str = None,
         sorting: str = None,
-        locality: str = None
+        locality: str = None,
+        fields: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
         """
         Filter hotel search results based on various criteria
@@ -470,6 +575,7 @@ class HotelAPIService:
             facility: Filter by facilities, comma-separated
             sorting: Sort results (price-low-high, rating-high-low, etc.)
             locality: Filter by locality/region, comma-separated
+            fields: Top-level hotel fields to build (all fields when None)
             
         Returns:
             Dict containing filtered hotel search results
@@ -516,8 +622,6 @@ class HotelAPIService:
                 "filters": filters
             }
             
-            logger.info(f"Filtering hotels with payload: {payload}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.get(
@@ -526,8 +630,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Hotel filter API response status: {response.status_code}")
-                logger.info(f"Hotel filter API response: {response.text}")
+                log_supplier_response("filter_results", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -537,7 +640,7 @@ class HotelAPIService:
                     }
                 
                 api_response = response.json()
-                return self._process_hotel_filter_response(api_response)
+                return self._process_hotel_filter_response(api_response, fields)
                 
         except httpx.TimeoutException:
             logger.error("Hotel filter API timeout")
@@ -554,7 +657,7 @@ class HotelAPIService:
                 "hotels": []
             }
     
-    def _process_hotel_filter_response(self, api_response: Dict[str, Any]) -> Dict[str, Any]:
+    def _process_hotel_filter_response(self, api_response: Dict[str, Any], fields: Optional[Set[str]] = None) -> Dict[str, Any]:
         """
         Process and normalize the hotel filter API response
         """
@@ -582,7 +685,7 @@ class HotelAPIService:
             # Process and normalize hotel data
             normalized_hotels = []
             for hotel_data in itineraries:
-                normalized_hotel = self._normalize_hotel_data(hotel_data)
+                normalized_hotel = self._normalize_hotel_data(hotel_data, fields)
                 normalized_hotels.append(normalized_hotel)
             
             return {
@@ -609,7 +712,8 @@ class HotelAPIService:
         self,
         session_id: str,
         next_token: str,
-        filter_key: str
+        filter_key: str,
+        fields: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
         """
         Get more hotel filter results using session ID, next token, and filter key
@@ -618,6 +722,7 @@ class HotelAPIService:
             session_id: Session ID from previous hotel search
             next_token: Token for retrieving next set of filtered results
             filter_key: Filter key from previous filter response
+            fields: Top-level hotel fields to build (all fields when None)
             
         Returns:
             Dict containing additional filtered hotel search results
@@ -630,8 +735,6 @@ class HotelAPIService:
                 "filterKey": filter_key
             }
             
-            logger.info(f"Getting more filter results with params: {params}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.get(
@@ -640,8 +743,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"More filter results API response status: {response.status_code}")
-                logger.info(f"More filter results API response: {response.text}")
+                log_supplier_response("more_filter_results", response, params)
                 
                 if response.status_code != 200:
                     return {
@@ -651,7 +753,7 @@ class HotelAPIService:
                     }
                 
                 api_response = response.json()
-                return self._process_hotel_filter_response(api_response)
+                return self._process_hotel_filter_response(api_response, fields)
                 
         except httpx.TimeoutException:
             logger.error("More filter results API timeout")
@@ -672,7 +774,8 @@ class HotelAPIService:
         self,
         session_id: str,
         next_token: str,
-        filter_key: str
+        filter_key: str,
+        fields: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
         """
         Get more hotel filter results using pagination (no result limit)
@@ -681,6 +784,7 @@ class HotelAPIService:
             session_id: Session ID from previous hotel search
             next_token: Token for retrieving next set of filtered results
             filter_key: Filter key from previous filter response
+            fields: Top-level hotel fields to build (all fields when None)
             
         Returns:
             Dict containing additional filtered hotel search results with full pagination
@@ -693,8 +797,6 @@ class HotelAPIService:
                 "filterKey": filter_key
             }
             
-            logger.info(f"Getting more filter results (pagination) with params: {params}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.get(
@@ -703,8 +805,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"More filter results pagination API response status: {response.status_code}")
-                logger.info(f"More filter results pagination API response: {response.text}")
+                log_supplier_response("filter_results_pagination", response, params)
                 
                 if response.status_code != 200:
                     return {
@@ -714,7 +815,7 @@ class HotelAPIService:
                     }
                 
                 api_response = response.json()
-                return self._process_hotel_filter_response(api_response)
+                return self._process_hotel_filter_response(api_response, fields)
                 
         except httpx.TimeoutException:
             logger.error("More filter results pagination API timeout")
@@ -759,8 +860,6 @@ class HotelAPIService:
                 "tokenId": token_id
             }
             
-            logger.info(f"Getting hotel details with params: {params}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.get(
@@ -769,8 +868,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Hotel details API response status: {response.status_code}")
-                logger.info(f"Hotel details API response: {response.text}")
+                log_supplier_response("hotel_details", response, params)
                 
                 if response.status_code != 200:
                     return {
@@ -871,33 +969,10 @@ class HotelAPIService:
         Categorize hotel facilities for better organization
         """
         try:
-            categories = {
-                "connectivity": [],
-                "dining": [],
-                "business": [],
-                "leisure": [],
-                "services": [],
-                "transportation": [],
-                "other": []
-            }
+            categories = {category: [] for category in FACILITY_CATEGORY_ORDER}
             
             for facility in facilities:
-                facility_lower = facility.lower()
-                
-                if any(keyword in facility_lower for keyword in ["wifi", "wlan", "internet", "wireless"]):
-                    categories["connectivity"].append(facility)
-                elif any(keyword in facility_lower for keyword in ["restaurant", "bar", "cafe", "dining", "breakfast", "room service"]):
-                    categories["dining"].append(facility)
-                elif any(keyword in facility_lower for keyword in ["conference", "meeting", "business", "boardroom"]):
-                    categories["business"].append(facility)
-                elif any(keyword in facility_lower for keyword in ["pool", "gym", "spa", "fitness", "casino", "games", "theatre", "nightclub"]):
-                    categories["leisure"].append(facility)
-                elif any(keyword in facility_lower for keyword in ["laundry", "concierge", "reception", "room service", "housekeeping", "medical"]):
-                    categories["services"].append(facility)
-                elif any(keyword in facility_lower for keyword in ["parking", "car park", "garage", "valet"]):
-                    categories["transportation"].append(facility)
-                else:
-                    categories["other"].append(facility)
+                categories[_facility_category(facility)].append(facility)
             
             # Remove empty categories
             return {k: v for k, v in categories.items() if v}
@@ -947,7 +1022,9 @@ class HotelAPIService:
         session_id: str,
         check_in_date: str,
         check_out_date: str,
-        rooms: List[Dict[str, Any]]
+        rooms: List[Dict[str, Any]],
+        product_id: Optional[str] = None,
+        token_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Get detailed room rates for a specific hotel
@@ -958,6 +1035,8 @@ class HotelAPIService:
             check_in_date: Check-in date
             check_out_date: Check-out date
             rooms: Room configuration
+            product_id: Product ID from search results, when known
+            token_id: Token ID from search results, when known
             
         Returns:
             Dict containing detailed room rates and availability
@@ -974,27 +1053,30 @@ class HotelAPIService:
                 "check_out_date": check_out_date,
                 "rooms": rooms
             }
+            if product_id:
+                payload["productId"] = product_id
+            if token_id:
+                payload["tokenId"] = token_id
             
-            logger.info(f"Getting room rates for hotel: {hotel_code}")
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
+            async with self._governor:
+                response = await self._get_client().post(
                     f"{self.base_url}/room_rates",
                     json=payload,
-                    headers=self.headers
+                    headers=self.headers,
+                    timeout=30.0
                 )
-                
-                logger.info(f"Room rates API response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    return {
-                        "success": False,
-                        "error": f"API request failed with status {response.status_code}",
-                        "room_rates": []
-                    }
-                
-                api_response = response.json()
-                return self._process_room_rates_response(api_response)
+            
+            log_supplier_response("room_rates", response, payload)
+            
+            if response.status_code != 200:
+                return {
+                    "success": False,
+                    "error": f"API request failed with status {response.status_code}",
+                    "room_rates": []
+                }
+            
+            api_response = response.json()
+            return self._process_room_rates_response(api_response)
                 
         except httpx.TimeoutException:
             logger.error("Room rates API timeout")
@@ -1011,6 +1093,83 @@ class HotelAPIService:
                 "room_rates": []
             }
     
+    async def get_bulk_room_rates(
+        self,
+        session_id: str,
+        hotels: List[Dict[str, str]],
+        check_in_date: str,
+        check_out_date: str,
+        rooms: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Get room rates for a shortlist of hotels in one call
+        
+        Rates are fetched concurrently under the shared governor and cached
+        per session, hotel offer, stay dates and occupancy for the session
+        lifetime, so repeated compare-view loads are served from memory.
+        
+        Args:
+            session_id: Search session ID
+            hotels: Shortlisted hotels, each with hotel_id, product_id and token_id
+            check_in_date: Check-in date
+            check_out_date: Check-out date
+            rooms: Room configuration
+            
+        Returns:
+            Dict containing room rates keyed by product_id (one per hotel offer)
+        """
+        occupancy = tuple(
+            (room.get("adults", 1), room.get("children", 0), tuple(room.get("child_ages") or ()))
+            for room in rooms
+        )
+        
+        async def fetch(hotel: Dict[str, str]) -> Dict[str, Any]:
+            cache_key = (
+                session_id, hotel["product_id"], hotel["token_id"],
+                check_in_date, check_out_date, occupancy
+            )
+            cached = self._room_rates_cache.get(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
+            
+            result = await self.get_room_rates(
+                hotel_code=hotel["hotel_id"],
+                session_id=session_id,
+                check_in_date=check_in_date,
+                check_out_date=check_out_date,
+                rooms=rooms,
+                product_id=hotel["product_id"],
+                token_id=hotel["token_id"]
+            )
+            if result.get("success"):
+                self._room_rates_cache.set(cache_key, result)
+            return {**result, "cached": False}
+        
+        # Drop duplicate shortlist entries so each offer is fetched once; one
+        # hotel may appear with several offers (product_id/token_id pairs)
+        unique_hotels = list({
+            (hotel["hotel_id"], hotel["product_id"], hotel["token_id"]): hotel for hotel in hotels
+        }.values())
+        results = await asyncio.gather(*(fetch(hotel) for hotel in unique_hotels))
+        
+        rates_by_offer = {
+            hotel["product_id"]: {**result, "hotel_id": hotel["hotel_id"]}
+            for hotel, result in zip(unique_hotels, results)
+        }
+        failed = [
+            {"hotel_id": hotel["hotel_id"], "product_id": hotel["product_id"]}
+            for hotel, result in zip(unique_hotels, results)
+            if not result.get("success")
+        ]
+        
+        return {
+            "success": len(failed) < len(unique_hotels),
+            "error": "Failed to get room rates for all hotels" if failed and len(failed) == len(unique_hotels) else None,
+            "room_rates": rates_by_offer,
+            "failed_hotels": failed,
+            "cache_hits": sum(1 for result in results if result.get("cached"))
+        }
+    
     def _process_room_rates_response(self, api_response: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process room rates API response
@@ -1074,8 +1233,6 @@ class HotelAPIService:
                 "paxDetails": pax_details
             }
             
-            logger.info(f"Booking hotel with payload: {payload}")
-            
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.post(
                     f"{self.base_url}/hotel_book",
@@ -1083,8 +1240,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Hotel booking API response status: {response.status_code}")
-                logger.info(f"Hotel booking API response: {response.text}")
+                log_supplier_response("hotel_booking", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -1259,8 +1415,6 @@ class HotelAPIService:
                 "referenceNum": reference_num
             }
             
-            logger.info(f"Getting booking details with payload: {payload}")
-            
             # Make the API call
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.post(
@@ -1269,8 +1423,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Booking details API response status: {response.status_code}")
-                logger.info(f"Booking details API response: {response.text}")
+                log_supplier_response("booking_details", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -1416,8 +1569,6 @@ class HotelAPIService:
                 "referenceNum": reference_num
             }
             
-            logger.info(f"Cancelling hotel booking with payload: {payload}")
-            
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.post(
                     f"{self.base_url}/cancel",
@@ -1425,8 +1576,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Hotel cancellation API response status: {response.status_code}")
-                logger.info(f"Hotel cancellation API response: {response.text}")
+                log_supplier_response("hotel_cancellation", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -1582,8 +1732,6 @@ class HotelAPIService:
             if country_name:
                 params["country_name"] = country_name
             
-            logger.info(f"Getting hotel static content with params: {params}")
-            
             async with httpx.AsyncClient(timeout=120.0) as client:
                 response = await client.get(
                     f"{self.base_url}/static_content",
@@ -1591,8 +1739,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Hotel static content API response status: {response.status_code}")
-                logger.info(f"Hotel static content API response length: {len(response.text)}")
+                log_supplier_response("static_content", response, params)
                 
                 if response.status_code != 200:
                     return {
@@ -1765,8 +1912,6 @@ class HotelAPIService:
                 "ip_address": self.ip_address
             }
             
-            logger.info("Getting hotel cities list")
-            
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.post(
                     f"{self.base_url}/hotel_cities",
@@ -1774,7 +1919,7 @@ class HotelAPIService:
                     headers=self.headers
                 )
                 
-                logger.info(f"Hotel cities API response status: {response.status_code}")
+                log_supplier_response("hotel_cities", response, payload)
                 
                 if response.status_code != 200:
                     return {
@@ -1806,11 +1951,35 @@ class HotelAPIService:
         Process cities API response
         """
         try:
-            # Placeholder implementation
+            # Check for error response
+            if isinstance(api_response, dict) and ("Errors" in api_response or api_response.get("error")):
+                error_info = api_response.get("Errors", {})
+                error_message = api_response.get("error", error_info.get("ErrorMessage", "Unknown error"))
+                return {
+                    "success": False,
+                    "error": f"Cities Error: {error_message}",
+                    "cities": []
+                }
+            
+            # The city list may come back bare or wrapped in a "cities" key
+            cities_data = api_response.get("cities", []) if isinstance(api_response, dict) else api_response
+            
+            cities = []
+            for city in cities_data or []:
+                city_name = city.get("cityName") or city.get("city_name") or city.get("city") or ""
+                if not city_name:
+                    continue
+                cities.append({
+                    "city_name": city_name,
+                    "country_name": city.get("countryName") or city.get("country_name") or city.get("country") or "",
+                    "city_code": city.get("cityCode") or city.get("city_code") or city.get("code") or "",
+                    "country_code": city.get("countryCode") or city.get("country_code") or ""
+                })
+            
             return {
                 "success": True,
-                "cities": [],
-                "total_cities": 0
+                "cities": cities,
+                "total_cities": len(cities)
             }
         except Exception as e:
             logger.error(f"Error processing cities response: {str(e)}")
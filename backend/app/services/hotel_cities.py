@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import unicodedata
+import uuid
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from ..config import settings
+from ..mongodb_models import HotelCity
+from .hotel_api import hotel_api_service
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_city_text(text: str) -> str:
+    """
+    Lowercase, strip accents and collapse punctuation for matching
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    cleaned = "".join(ch if ch.isalnum() else " " for ch in ascii_text.lower())
+    return " ".join(cleaned.split())
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Best-ranked city ids whose indexed text passes through this node
+        self.ids: List[int] = []
+
+
+class CityTrie:
+    """
+    Prefix trie over city and country names with typo-tolerant lookup
+
+    Every word start of a city name and its country is indexed, so "york"
+    finds "New York" and "india" finds Indian cities. Each node keeps only
+    the top ``ids_per_node`` cities, so a lookup never walks a subtree.
+    """
+
+    def __init__(self, cities: List[Dict[str, Any]], ids_per_node: int = 20):
+        self.ids_per_node = ids_per_node
+        self.root = _TrieNode()
+        # Shorter names first, so the best completions are inserted first
+        self.cities = sorted(cities, key=lambda c: (len(c["city_name"]), c["city_name"]))
+
+        for city_id, city in enumerate(self.cities):
+            for text in self._index_terms(city):
+                self._insert(text, city_id)
+
+        # Search box traffic repeats the same short prefixes constantly, and
+        # the trie never changes after build, so memoize whole lookups
+        self._cached_suggest = lru_cache(maxsize=4096)(self._suggest)
+
+    def _index_terms(self, city: Dict[str, Any]) -> set:
+        terms = set()
+        for value in (city.get("city_name"), city.get("country_name")):
+            words = normalize_city_text(value).split()
+            for i in range(len(words)):
+                terms.add(" ".join(words[i:]))
+        return terms
+
+    def _insert(self, text: str, city_id: int) -> None:
+        node = self.root
+        for ch in text:
+            node = node.children.setdefault(ch, _TrieNode())
+            if len(node.ids) < self.ids_per_node and (not node.ids or node.ids[-1] != city_id):
+                node.ids.append(city_id)
+
+    def _prefix_ids(self, query: str) -> List[int]:
+        node = self.root
+        for ch in query:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return node.ids
+
+    def _fuzzy_ids(self, query: str, max_distance: int) -> Dict[int, int]:
+        """
+        Find cities with an indexed prefix within ``max_distance`` edits of the query
+        """
+        matches: Dict[int, int] = {}
+        # Search box typos rarely hit the first letter, so anchor on it
+        start = self.root.children.get(query[0])
+        if start is None:
+            return matches
+        first_row = list(range(len(query)))
+
+        # Walk the trie carrying one Levenshtein row per node, pruning any
+        # branch whose best possible distance already exceeds the limit
+        query = query[1:]
+        stack = [(child, ch, first_row) for ch, child in start.children.items()]
+        while stack:
+            node, ch, previous_row = stack.pop()
+            row = [previous_row[0] + 1]
+            for i in range(1, len(query) + 1):
+                row.append(min(
+                    row[i - 1] + 1,
+                    previous_row[i] + 1,
+                    previous_row[i - 1] + (query[i - 1] != ch)
+                ))
+
+            if row[-1] <= max_distance:
+                for city_id in node.ids:
+                    if row[-1] < matches.get(city_id, max_distance + 1):
+                        matches[city_id] = row[-1]
+
+            # Deeper nodes can only improve on this one if some row entry is lower
+            best = min(row)
+            if best <= max_distance and (row[-1] > max_distance or best < row[-1]):
+                stack.extend((child, next_ch, row) for next_ch, child in node.children.items())
+
+        return matches
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Suggest cities for a search box query, prefix matches first
+        """
+        normalized = normalize_city_text(query)
+        if not normalized:
+            return []
+        return list(self._cached_suggest(normalized, limit))
+
+    def _suggest(self, normalized: str, limit: int) -> tuple:
+        results = []
+        seen = set()
+        for city_id in self._prefix_ids(normalized):
+            seen.add(city_id)
+            results.append({**self.cities[city_id], "match": "prefix", "distance": 0})
+            if len(results) >= limit:
+                return tuple(results)
+
+        # Typo fallback: allow one edit for short queries, two for longer ones
+        if len(normalized) < 3:
+            return tuple(results)
+        max_distance = 1 if len(normalized) <= 6 else 2
+        fuzzy = self._fuzzy_ids(normalized, max_distance)
+        for city_id, distance in sorted(fuzzy.items(), key=lambda item: (item[1], item[0])):
+            if city_id in seen:
+                continue
+            results.append({**self.cities[city_id], "match": "fuzzy", "distance": distance})
+            if len(results) >= limit:
+                break
+
+        return tuple(results)
+
+
+class HotelCityService:
+    """
+    Hotel cities catalogue persisted in MongoDB and served from memory
+
+    The supplier city list is stored in the ``hotel_cities`` collection and
+    refreshed on a schedule; requests are answered from the in-memory list
+    and trie without calling the supplier. ``cities`` keeps the supplier's
+    order; only the trie ranks by name length.
+
+    A refresh writes the new list to a staging collection and renames it
+    over ``hotel_cities``, so readers never see a partial or empty list and
+    concurrent refreshes cannot interleave their rows.
+    """
+
+    def __init__(self):
+        self.refresh_interval = timedelta(hours=settings.HOTEL_CITIES_REFRESH_HOURS)
+        self.cities: List[Dict[str, Any]] = []
+        self.trie = CityTrie([])
+        self.last_refreshed: Optional[datetime] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+
+    def _load(self, cities: List[Dict[str, Any]], refreshed_at: datetime) -> None:
+        self.trie = CityTrie(cities)
+        self.cities = cities
+        self.last_refreshed = refreshed_at
+
+    async def load_from_database(self) -> None:
+        """
+        Load the persisted city list into memory
+        """
+        documents = await HotelCity.find_all().sort("position").to_list()
+        if documents:
+            cities = [
+                {
+                    "city_name": doc.city_name,
+                    "country_name": doc.country_name,
+                    "city_code": doc.city_code,
+                    "country_code": doc.country_code
+                }
+                for doc in documents
+            ]
+            self._load(cities, min(doc.updated_at for doc in documents))
+            logger.info(f"Loaded {len(cities)} hotel cities from database")
+
+    async def refresh(self) -> bool:
+        """
+        Fetch the city list from the supplier, persist it and reload memory
+        """
+        async with self._refresh_lock:
+            result = await hotel_api_service.get_cities()
+            if not result["success"] or not result["cities"]:
+                logger.warning(f"Hotel cities refresh skipped: {result.get('error', 'empty city list')}")
+                return False
+
+            refreshed_at = datetime.utcnow()
+            collection = HotelCity.get_motor_collection()
+            staging = collection.database[f"{collection.name}_staging_{uuid.uuid4().hex}"]
+            try:
+                await staging.insert_many([
+                    HotelCity(**city, position=position, updated_at=refreshed_at).dict(exclude={"id", "revision_id"})
+                    for position, city in enumerate(result["cities"])
+                ])
+                await staging.rename(collection.name, dropTarget=True)
+            except Exception:
+                await staging.drop()
+                raise
+            self._load(result["cities"], refreshed_at)
+            logger.info(f"Refreshed {len(result['cities'])} hotel cities from supplier")
+            return True
+
+    def is_stale(self) -> bool:
+        return self.last_refreshed is None or datetime.utcnow() - self.last_refreshed >= self.refresh_interval
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            if self.is_stale():
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error(f"Hotel cities refresh error: {str(e)}")
+
+            if self.is_stale():
+                # Retry failed refreshes sooner than the regular schedule
+                delay = 300
+            else:
+                delay = (self.last_refreshed + self.refresh_interval - datetime.utcnow()).total_seconds()
+            await asyncio.sleep(delay)
+
+    async def start(self) -> None:
+        """
+        Load persisted cities and start the scheduled refresh task
+        """
+        await self.load_from_database()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def get_cities(self) -> Dict[str, Any]:
+        """
+        Get the city catalogue, fetching it once if nothing is loaded yet
+        """
+        if not self.cities:
+            await self.refresh()
+
+        return {
+            "success": bool(self.cities),
+            "error": None if self.cities else "City list is not available yet",
+            "cities": self.cities,
+            "total_cities": len(self.cities),
+            "last_refreshed": self.last_refreshed.isoformat() if self.last_refreshed else None
+        }
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.trie.suggest(query, limit)
+
+
+# Initialize the hotel city service
+hotel_city_service = HotelCityService()
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+
+def _is_legacy_hash(password_hash: str) -> bool:
+    """
+    Whether a hash is the old ``salt:sha256`` format
+    """
+    salt, _, digest = password_hash.partition(":")
+    return len(salt) == 64 and len(digest) == 64 and not password_hash.startswith("$")
+
+
+def _verify_legacy(password: str, password_hash: str) -> bool:
+    salt, digest = password_hash.split(":")
+    return hmac.compare_digest(hashlib.sha256((password + salt).encode()).hexdigest(), digest)
+
+
+class PasswordHasher:
+    """
+    Password hashing with a configurable passlib KDF, off the event loop
+
+    Hashes and verifications run in a dedicated thread pool. At most
+    ``workers + max_pending`` calls may be in flight; beyond that the call
+    fails fast with PasswordHasherBusyError instead of queueing without
+    bound, so a login storm sheds load rather than piling up.
+
+    ``verify`` also returns a replacement hash when the stored one is a
+    legacy salted SHA-256 hash or uses a deprecated scheme or cost.
+    """
+
+    def __init__(
+        self,
+        schemes: str = settings.PASSWORD_HASH_SCHEMES,
+        bcrypt_rounds: int = settings.PASSWORD_BCRYPT_ROUNDS,
+        workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_pending: int = settings.PASSWORD_HASH_MAX_PENDING
+    ):
+        # The first scheme hashes new passwords; the rest are only verified
+        self._context = CryptContext(
+            schemes=[scheme.strip() for scheme in schemes.split(",") if scheme.strip()],
+            deprecated="auto",
+            bcrypt__rounds=bcrypt_rounds
+        )
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = asyncio.Semaphore(workers + max_pending)
+
+    async def _run(self, func, *args):
+        if self._slots.locked():
+            raise PasswordHasherBusyError("Too many password operations in progress")
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    def _verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        if _is_legacy_hash(password_hash):
+            if not _verify_legacy(password, password_hash):
+                return False, None
+            return True, self._context.hash(password)
+
+        try:
+            return self._context.verify_and_update(password, password_hash)
+        except ValueError:
+            # Not a hash any configured scheme recognises
+            return False, None
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password with the preferred scheme
+
+        Raises:
+            PasswordHasherBusyError: If the hashing queue is full
+        """
+        return await self._run(self._context.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against its stored hash
+
+        Args:
+            password: Plain text password
+            password_hash: Stored hash (passlib or legacy salt:sha256 format)
+
+        Returns:
+            Tuple of (valid, replacement hash to store or None)
+
+        Raises:
+            PasswordHasherBusyError: If the hashing queue is full
+        """
+        return await self._run(self._verify_and_update, password, password_hash)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+# Initialize the password hasher
+password_hasher = PasswordHasher()
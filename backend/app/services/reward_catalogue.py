@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import settings
+from ..models.wallet import RewardItem
+
+logger = logging.getLogger(__name__)
+
+# Fields returned by the rewards page
+REWARD_FIELDS = ["name", "description", "points_required", "category", "image_url"]
+
+
+class RewardCatalogueService:
+    """
+    Active reward items held in memory, sorted by points required
+
+    The catalogue is loaded in one query and kept per category as parallel
+    lists of rewards and their point costs, so the rewards a user can afford
+    are a prefix found with a binary search on their points. Writes through
+    the RewardItem model bump its ``catalogue_version`` and force a reload;
+    changes made outside this process are picked up when the cache expires.
+    """
+
+    def __init__(self, ttl_seconds: float = settings.REWARD_CATALOGUE_CACHE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._catalogues: Dict[Optional[str], Tuple[List[Dict[str, Any]], List[int]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._version: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and self._version == RewardItem.catalogue_version
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    async def _load(self) -> None:
+        version = RewardItem.catalogue_version
+        rows = await RewardItem.get_motor_collection().find(
+            {"is_active": True},
+            REWARD_FIELDS
+        ).sort([("points_required", 1), ("_id", 1)]).to_list(length=None)
+
+        by_category: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            reward = {"id": str(row.pop("_id")), **{field: row.get(field) for field in REWARD_FIELDS}}
+            by_category[None].append(reward)
+            by_category[reward["category"]].append(reward)
+
+        self._catalogues = {
+            category: (rewards, [reward["points_required"] for reward in rewards])
+            for category, rewards in by_category.items()
+        }
+        self._version = version
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(rows)} active rewards into the catalogue cache")
+
+    async def get_rewards(self, user_points: int, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Active rewards in points order, flagged with whether the user can redeem them
+
+        Args:
+            user_points: The user's current points balance
+            category: Restrict to one reward category
+
+        Returns:
+            List of reward dicts with a ``can_redeem`` flag
+        """
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    await self._load()
+
+        rewards, costs = self._catalogues.get(category or None, ([], []))
+        affordable = bisect_right(costs, user_points)
+        return [
+            {**reward, "can_redeem": position < affordable}
+            for position, reward in enumerate(rewards)
+        ]
+
+
+# Initialize the reward catalogue service
+reward_catalogue_service = RewardCatalogueService()
@@ -0,0 +1,189 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import ReturnDocument
+from ..models.referral import Referral, ReferralEarning, UserReferralStats, ReferralStatus, ReferralTier
+from ..models.wallet import TransactionType, TransactionStatus
+from ..mongodb_database import get_or_create_many, apply_once, insert_once
+from .event_queue import event_queue_service
+from .wallet_ledger import wallet_ledger_service
+
+logger = logging.getLogger(__name__)
+
+# Event types published by the referral and wallet routes
+REFERRAL_REGISTERED = "referral.registered"
+REFERRAL_BOOKED = "referral.booked"
+POINTS_EARNED = "wallet.points_earned"
+
+
+def referral_tier_for(tier_points: int, current_tier: ReferralTier) -> ReferralTier:
+    """
+    Referral tier after an upgrade check (tiers never move down)
+    """
+    if tier_points >= 50 and current_tier != ReferralTier.PLATINUM:
+        return ReferralTier.PLATINUM
+    if tier_points >= 25 and current_tier not in [ReferralTier.GOLD, ReferralTier.PLATINUM]:
+        return ReferralTier.GOLD
+    if tier_points >= 10 and current_tier == ReferralTier.BRONZE:
+        return ReferralTier.SILVER
+    return current_tier
+
+
+async def _advance_referral(
+    claim: Dict[str, Any],
+    claimed: Dict[str, Any],
+    changes: Dict[str, Any],
+    session
+) -> Optional[Dict[str, Any]]:
+    """
+    Move a referral to its next status, or find the one an earlier attempt
+    of the same event already moved; None if there is neither
+    """
+    collection = Referral.get_motor_collection()
+    referral = await collection.find_one_and_update(
+        claim,
+        {"$set": changes},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if referral is None:
+        referral = await collection.find_one(claimed, session=session)
+    return referral
+
+
+async def _credit_referrers(credits: List[Dict[str, Any]], session) -> None:
+    """
+    Record referrer earnings and stats for a batch of events, each at most once
+
+    Args:
+        credits: One dict per event with ``event_id``, ``referral`` (raw
+            document), ``amount``, ``type`` (earning type) and
+            ``increments`` (UserReferralStats counters)
+    """
+    if not credits:
+        return
+    await insert_once(ReferralEarning, [
+        ReferralEarning(
+            user_id=credit["referral"]["referrer_id"],
+            referral_id=str(credit["referral"]["_id"]),
+            amount=credit["amount"],
+            type=credit["type"],
+            event_id=credit["event_id"]
+        )
+        for credit in credits
+    ], session=session)
+
+    referrer_ids = list({credit["referral"]["referrer_id"] for credit in credits})
+    await get_or_create_many(UserReferralStats, [{"user_id": user_id} for user_id in referrer_ids], session=session)
+    now = datetime.utcnow()
+    await apply_once(UserReferralStats, [
+        (
+            {"user_id": credit["referral"]["referrer_id"]},
+            credit["event_id"],
+            {"$inc": credit["increments"], "$set": {"last_updated": now}}
+        )
+        for credit in credits
+    ], session=session)
+
+    # Tiers only move up, so repeating the check on a retry is harmless
+    collection = UserReferralStats.get_motor_collection()
+    for stats in await collection.find({"user_id": {"$in": referrer_ids}}, session=session).to_list(length=None):
+        current_tier = ReferralTier(stats["current_tier"])
+        new_tier = referral_tier_for(stats["tier_points"], current_tier)
+        if new_tier != current_tier:
+            await collection.update_one(
+                {"_id": stats["_id"]},
+                {"$set": {"current_tier": new_tier.value}},
+                session=session
+            )
+
+
+# Every handler is idempotent per outbox event: on a standalone server a
+# batch that failed partway is retried, so some of its events may already
+# have been applied.
+
+@event_queue_service.handler(REFERRAL_REGISTERED)
+async def apply_referral_registrations(events: List[Dict[str, Any]], session) -> None:
+    credits = []
+    for event in events:
+        payload = event["payload"]
+        referral = await _advance_referral(
+            {"referral_code": payload["referral_code"], "status": ReferralStatus.PENDING.value},
+            {"referral_code": payload["referral_code"], "referred_id": payload["user_id"]},
+            {
+                "referred_id": payload["user_id"],
+                "status": ReferralStatus.REGISTERED.value,
+                "registration_date": event["created_at"]
+            },
+            session
+        )
+        if referral is None:
+            logger.info(f"No pending referral left for code {payload['referral_code']}")
+            continue
+
+        credits.append({
+            "event_id": str(event["_id"]),
+            "referral": referral,
+            "amount": referral["registration_reward"],
+            "type": "registration",
+            "increments": {"pending_rewards": referral["registration_reward"], "tier_points": 1}
+        })
+    await _credit_referrers(credits, session)
+
+
+@event_queue_service.handler(REFERRAL_BOOKED)
+async def apply_referral_bookings(events: List[Dict[str, Any]], session) -> None:
+    credits = []
+    for event in events:
+        user_id = event["payload"]["user_id"]
+        referral = await _advance_referral(
+            {"referred_id": user_id, "status": ReferralStatus.REGISTERED.value},
+            {"referred_id": user_id, "status": ReferralStatus.BOOKED.value},
+            {"status": ReferralStatus.BOOKED.value, "first_booking_date": event["created_at"]},
+            session
+        )
+        if referral is None:
+            continue
+
+        # More tier points for successful bookings
+        credits.append({
+            "event_id": str(event["_id"]),
+            "referral": referral,
+            "amount": referral["booking_reward"],
+            "type": "booking",
+            "increments": {"successful_bookings": 1, "pending_rewards": referral["booking_reward"], "tier_points": 5}
+        })
+    await _credit_referrers(credits, session)
+
+
+@event_queue_service.handler(POINTS_EARNED)
+async def apply_points_earned(events: List[Dict[str, Any]], session) -> None:
+    now = datetime.utcnow()
+    credits = []
+    for event in events:
+        payload = event["payload"]
+        credits.append({
+            "user_id": payload["user_id"],
+            "event_id": str(event["_id"]),
+            "entries": [
+                {
+                    "type": TransactionType.POINTS,
+                    "points": payload["points"],
+                    "description": f"Points earned: {payload['description']}",
+                    "reference_id": payload.get("booking_id"),
+                    "status": TransactionStatus.COMPLETED,
+                    "completed_at": now
+                },
+                {
+                    "type": TransactionType.CASHBACK,
+                    "amount": payload["cashback"],
+                    "description": f"Cashback: {payload['description']}",
+                    "reference_id": payload.get("booking_id"),
+                    "status": TransactionStatus.COMPLETED,
+                    "completed_at": now
+                }
+            ],
+            "points": payload["points"],
+            "cashback": payload["cashback"]
+        })
+    await wallet_ledger_service.record_events(credits, session=session)
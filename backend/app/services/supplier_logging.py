@@ -0,0 +1,116 @@
+"""
+Structured logging for supplier (TravelNext) API traffic
+
+Each supplier call is summarised as one record with its operation, status,
+latency and response size. Successful calls are sampled; failed calls are
+always logged together with a truncated response body and the redacted
+request. Records are handed to a queue and written by a listener thread,
+so formatting output and disk/console I/O stay off the event loop.
+"""
+
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+supplier_logger = logging.getLogger("app.supplier")
+
+REDACTED = "***"
+SENSITIVE_KEYS = {
+    "user_id", "user_password", "password", "access_token", "api_key",
+    "customerEmail", "customerPhone", "paxDetails", "paxInfo"
+}
+
+_listener: Optional[QueueListener] = None
+
+
+def redact(data: Any) -> Any:
+    """
+    Return a copy of a request payload/params with credentials masked
+    """
+    if isinstance(data, dict):
+        return {
+            key: REDACTED if key in SENSITIVE_KEYS else redact(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [redact(item) for item in data]
+    return data
+
+
+def log_supplier_response(
+    operation: str,
+    response: httpx.Response,
+    request_data: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Log one supplier call: sampled on success, always (with body) on error
+    """
+    is_error = response.status_code != 200
+    if not is_error and (
+        not supplier_logger.isEnabledFor(logging.INFO)
+        or random.random() >= settings.SUPPLIER_LOG_SAMPLE_RATE
+    ):
+        return
+
+    summary = {
+        "operation": operation,
+        "status": response.status_code,
+        "latency_ms": round(response.elapsed.total_seconds() * 1000, 1),
+        "size": len(response.content),
+    }
+
+    if is_error:
+        summary["body"] = response.text[:settings.SUPPLIER_LOG_BODY_LIMIT]
+        summary["request"] = redact(request_data)
+        supplier_logger.warning(
+            "supplier_call operation=%s status=%s latency_ms=%s size=%s body=%r request=%s",
+            operation, summary["status"], summary["latency_ms"], summary["size"],
+            summary["body"], summary["request"],
+            extra={"supplier": summary}
+        )
+    else:
+        supplier_logger.info(
+            "supplier_call operation=%s status=%s latency_ms=%s size=%s",
+            operation, summary["status"], summary["latency_ms"], summary["size"],
+            extra={"supplier": summary}
+        )
+
+
+def start_supplier_logging() -> None:
+    """
+    Route supplier records through a queue drained by a background thread
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handlers = logging.getLogger().handlers or [logging.StreamHandler()]
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    supplier_logger.addHandler(QueueHandler(log_queue))
+    supplier_logger.setLevel(logging.INFO)
+    supplier_logger.propagate = False
+    _listener.start()
+
+
+def stop_supplier_logging() -> None:
+    """
+    Flush queued supplier records and stop the listener thread
+    """
+    global _listener
+    if _listener is None:
+        return
+
+    _listener.stop()
+    _listener = None
+    for handler in list(supplier_logger.handlers):
+        if isinstance(handler, QueueHandler):
+            supplier_logger.removeHandler(handler)
+    supplier_logger.propagate = True
@@ -0,0 +1,307 @@
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
+from ..config import settings
+from ..models.wallet import Wallet, Transaction, MembershipTier, WalletStats
+from ..mongodb_database import run_in_transaction, get_or_create, get_or_create_many, apply_once, insert_once
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Lifetime tier points needed for each tier, highest first
+TIER_THRESHOLDS = [
+    (MembershipTier.PLATINUM, 30000),
+    (MembershipTier.GOLD, 15000),
+    (MembershipTier.SILVER, 5000),
+    (MembershipTier.BRONZE, 0),
+]
+TIER_ORDER = [MembershipTier.BRONZE, MembershipTier.SILVER, MembershipTier.GOLD, MembershipTier.PLATINUM]
+
+
+class InsufficientFundsError(Exception):
+    pass
+
+
+def tier_for_points(tier_points: int) -> MembershipTier:
+    for tier, threshold in TIER_THRESHOLDS:
+        if tier_points >= threshold:
+            return tier
+    return MembershipTier.BRONZE
+
+
+def tier_progress(membership_tier: MembershipTier, tier_points: int) -> float:
+    """
+    Percentage of the way from the current tier to the next one
+    """
+    thresholds = dict(TIER_THRESHOLDS)
+    position = TIER_ORDER.index(membership_tier)
+    if position == len(TIER_ORDER) - 1:
+        return 100
+
+    current_threshold = thresholds[membership_tier]
+    next_threshold = thresholds[TIER_ORDER[position + 1]]
+    if next_threshold - tier_points <= 0:
+        return 100
+    return (tier_points - current_threshold) / (next_threshold - current_threshold) * 100
+
+
+class WalletLedgerService:
+    """
+    Wallet balance and points changes applied as single atomic updates
+
+    Every change is one conditional ``find_one_and_update`` with ``$inc``;
+    debits carry a ``>=`` guard, so concurrent requests can neither lose
+    updates nor overdraw. ``record`` pairs the change with its Transaction
+    rows inside a multi-document transaction when the deployment supports it.
+
+    The wallet also carries a denormalized ``transaction_count`` and
+    ``tier_progress``, so ``get_summary`` is a cache lookup or one indexed
+    read. Every change invalidates the owner's cached summary in this
+    process; other workers (including the event queue in another process)
+    see it once their short-lived entry expires.
+    """
+
+    def __init__(self):
+        self._summary_cache = TTLCache(settings.WALLET_SUMMARY_CACHE_SECONDS, max_entries=10000)
+
+    async def adjust(
+        self,
+        user_id: str,
+        balance: float = 0.0,
+        points: int = 0,
+        tier_points: int = 0,
+        cashback: float = 0.0,
+        transactions: int = 0,
+        session=None
+    ) -> Dict[str, Any]:
+        """
+        Apply deltas to a user's wallet, creating it for credits
+
+        Args:
+            user_id: Wallet owner
+            balance: Balance delta (negative for debits)
+            points: Points delta (negative for redemptions)
+            tier_points: Lifetime tier points delta
+            cashback: Total cashback delta
+            transactions: Number of Transaction rows recorded with this change
+            session: Optional MongoDB session
+
+        Returns:
+            The updated wallet document
+
+        Raises:
+            InsufficientFundsError: If a debit would take balance or points below zero
+        """
+        query: Dict[str, Any] = {"user_id": user_id}
+        if balance < 0:
+            query["balance"] = {"$gte": -balance}
+        if points < 0:
+            query["points"] = {"$gte": -points}
+        is_debit = len(query) > 1
+
+        now = datetime.utcnow()
+        wallet = await Wallet.get_motor_collection().find_one_and_update(
+            query,
+            {
+                "$inc": {
+                    "balance": balance,
+                    "points": points,
+                    "tier_points": tier_points,
+                    "total_cashback": cashback,
+                    "transaction_count": transactions
+                },
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"membership_tier": MembershipTier.BRONZE.value, "created_at": now}
+            },
+            upsert=not is_debit,
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        self._summary_cache.pop(user_id)
+        if wallet is None:
+            raise InsufficientFundsError("Insufficient points" if points < 0 else "Insufficient funds")
+
+        if tier_points > 0:
+            wallet = await self._update_tier(wallet, session)
+        return wallet
+
+    async def _update_tier(self, wallet: Dict[str, Any], session=None) -> Dict[str, Any]:
+        """
+        Upgrade the tier if a threshold was crossed and refresh tier progress
+        """
+        current = MembershipTier(wallet["membership_tier"])
+        target = max(tier_for_points(wallet["tier_points"]), current, key=TIER_ORDER.index)
+
+        # Tiers only move up; matching on tier_points means a concurrent
+        # earn (which runs its own refresh) wins instead of being overwritten
+        updated = await Wallet.get_motor_collection().find_one_and_update(
+            {"_id": wallet["_id"], "tier_points": wallet["tier_points"]},
+            {"$set": {
+                "membership_tier": target.value,
+                "tier_progress": tier_progress(target, wallet["tier_points"])
+            }},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        return updated or wallet
+
+    async def record(
+        self,
+        user_id: str,
+        entries: List[Dict[str, Any]],
+        session=None,
+        **deltas
+    ) -> Tuple[Dict[str, Any], List[Transaction]]:
+        """
+        Apply wallet deltas and insert the matching Transaction rows together
+
+        Args:
+            user_id: Wallet owner
+            entries: Transaction fields (without user_id/wallet_id), one dict per row
+            session: Session of an enclosing transaction; a new one is used when omitted
+            **deltas: Passed to ``adjust``
+
+        Returns:
+            Tuple of (updated wallet document, inserted transactions)
+        """
+        async def apply(session):
+            wallet = await self.adjust(user_id, transactions=len(entries), session=session, **deltas)
+            transactions = []
+            for entry in entries:
+                transaction = Transaction(user_id=user_id, wallet_id=str(wallet["_id"]), **entry)
+                await transaction.insert(session=session)
+                transactions.append(transaction)
+            return wallet, transactions
+
+        if session is not None:
+            return await apply(session)
+        result = await run_in_transaction(apply)
+        # Drop anything a concurrent reader cached before the commit
+        self._summary_cache.pop(user_id)
+        return result
+
+    async def record_events(self, credits: List[Dict[str, Any]], session=None) -> None:
+        """
+        Credit points and cashback for a batch of outbox events, each at most once
+
+        Each wallet increment is guarded by ``apply_once`` and the Transaction
+        rows carry the event ID under a unique index, so retrying an event
+        never credits the wallet twice, even without a transaction. Wallets
+        are created, credited and given their rows with one bulk write each.
+
+        Args:
+            credits: One dict per event with ``user_id``, ``event_id``,
+                ``entries`` (Transaction fields without user_id/wallet_id),
+                ``points`` (also credited as tier points) and ``cashback``
+            session: Optional MongoDB session
+        """
+        if not credits:
+            return
+        user_ids = list({credit["user_id"] for credit in credits})
+        await get_or_create_many(Wallet, [{"user_id": user_id} for user_id in user_ids], session=session)
+
+        now = datetime.utcnow()
+        await apply_once(Wallet, [
+            (
+                {"user_id": credit["user_id"]},
+                credit["event_id"],
+                {
+                    "$inc": {
+                        "balance": credit["cashback"],
+                        "points": credit["points"],
+                        "tier_points": credit["points"],
+                        "total_cashback": credit["cashback"],
+                        "transaction_count": len(credit["entries"])
+                    },
+                    "$set": {"updated_at": now}
+                }
+            )
+            for credit in credits
+        ], session=session)
+        for user_id in user_ids:
+            self._summary_cache.pop(user_id)
+
+        wallets = {
+            wallet["user_id"]: wallet
+            for wallet in await Wallet.get_motor_collection().find(
+                {"user_id": {"$in": user_ids}}, session=session
+            ).to_list(length=None)
+        }
+
+        # The tier refresh is idempotent, so a retry finishes one an earlier attempt missed
+        for user_id in {credit["user_id"] for credit in credits if credit["points"] > 0}:
+            await self._update_tier(wallets[user_id], session)
+
+        await insert_once(Transaction, [
+            Transaction(
+                user_id=credit["user_id"],
+                wallet_id=str(wallets[credit["user_id"]]["_id"]),
+                event_id=credit["event_id"],
+                **entry
+            )
+            for credit in credits
+            for entry in credit["entries"]
+        ], session=session)
+
+    async def get_summary(self, user_id: str) -> WalletStats:
+        """
+        Wallet summary for the app header, cached briefly per user
+        """
+        summary = self._summary_cache.get(user_id)
+        if summary is not None:
+            return summary
+
+        wallet = await get_or_create(Wallet, {"user_id": user_id})
+        summary = WalletStats(
+            total_balance=wallet.balance,
+            total_points=wallet.points,
+            total_transactions=wallet.transaction_count,
+            cashback_earned=wallet.total_cashback,
+            membership_tier=wallet.membership_tier.value,
+            tier_progress=wallet.tier_progress
+        )
+        self._summary_cache.set(user_id, summary)
+        return summary
+
+    async def backfill_summary_fields(self) -> int:
+        """
+        Populate transaction_count and tier_progress on wallets created before they existed
+
+        Returns:
+            Number of wallets updated
+        """
+        wallets = await Wallet.get_motor_collection().find(
+            {"transaction_count": {"$exists": False}},
+            {"user_id": 1, "membership_tier": 1, "tier_points": 1}
+        ).to_list(length=None)
+        if not wallets:
+            return 0
+
+        counts = {
+            row["_id"]: row["count"]
+            for row in await Transaction.get_motor_collection().aggregate([
+                {"$match": {"user_id": {"$in": [wallet["user_id"] for wallet in wallets]}}},
+                {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+        }
+
+        # $max keeps any ledger increments that landed on the missing field meanwhile
+        await Wallet.get_motor_collection().bulk_write([
+            UpdateOne(
+                {"_id": wallet["_id"]},
+                {
+                    "$max": {"transaction_count": counts.get(wallet["user_id"], 0)},
+                    "$set": {"tier_progress": tier_progress(
+                        MembershipTier(wallet["membership_tier"]), wallet.get("tier_points", 0)
+                    )}
+                }
+            )
+            for wallet in wallets
+        ], ordered=False)
+        logger.info(f"Backfilled summary fields on {len(wallets)} wallets")
+        return len(wallets)
+
+
+# Initialize the wallet ledger service
+wallet_ledger_service = WalletLedgerService()
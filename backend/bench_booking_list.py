@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+
+from app.config import settings
+from app.mongodb_indexes import DOCUMENT_MODELS
+from app.mongodb_models import Booking
+from app.mongodb_database import db_service
+
+
+def build_bookings(user_id: str, count: int = 1000):
+    """Build a booking history with a realistic mix of booking types"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    return [
+        Booking(
+            user_id=user_id,
+            booking_type=rng.choice(["flight", "hotel", "package"]),
+            item_id=f"item-{rng.randint(1, 200)}",
+            check_in_date=(now + timedelta(days=i % 90)).strftime("%Y-%m-%d"),
+            passengers=rng.randint(1, 4),
+            special_requests="Window seat, vegetarian meal" if i % 3 == 0 else None,
+            total_amount=round(rng.uniform(50, 2500), 2),
+            created_at=now - timedelta(minutes=i)
+        )
+        for i in range(count)
+    ]
+
+
+async def bench(label, func, rounds=10):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = await func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<10} {best * 1000:8.2f} ms for {len(rows)} bookings")
+    return best
+
+
+async def main():
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database_name = f"{settings.MONGODB_DATABASE}_bench"
+    await init_beanie(database=client[database_name], document_models=DOCUMENT_MODELS)
+
+    try:
+        user_id = "bench-user"
+        await Booking.insert_many(build_bookings(user_id))
+
+        hydrated = {b["id"]: b for b in await db_service.get_user_bookings(user_id)}
+        raw = await db_service.list_user_bookings(user_id)
+        assert len(raw) == len(hydrated)
+        for booking in raw:
+            expected = hydrated[booking["id"]]
+            for field, value in booking.items():
+                assert value == expected[field] or str(value) == str(expected[field]), field
+
+        legacy = await bench("hydrated", lambda: db_service.get_user_bookings(user_id))
+        current = await bench("raw", lambda: db_service.list_user_bookings(user_id))
+        print(f"speedup    {legacy / current:8.2f}x")
+    finally:
+        await client.drop_database(database_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import random
+import time
+
+from app.services.hotel_api import hotel_api_service
+
+FACILITY_VOCABULARY = [
+    "Free WiFi", "WiFi in public areas", "Wireless internet", "High-speed Internet",
+    "Restaurant", "Bar", "Poolside bar", "Cafe", "Breakfast buffet", "24-hour room service",
+    "Conference rooms", "Meeting facilities", "Business centre", "Boardroom",
+    "Outdoor swimming pool", "Gym", "Spa and wellness centre", "Fitness centre", "Casino",
+    "Games room", "Theatre", "Nightclub", "Laundry service", "Concierge", "24-hour reception",
+    "Housekeeping", "Medical assistance", "Free parking", "Car park", "Garage", "Valet parking",
+    "Airport shuttle", "Garden", "Terrace", "Non-smoking rooms", "Elevator", "Safe deposit box",
+    "Currency exchange", "Luggage storage", "Tour desk", "Heating", "Air conditioning",
+]
+
+
+def legacy_categorize_facilities(facilities):
+    """Reference copy of the keyword scan that _categorize_facilities replaced"""
+    categories = {
+        "connectivity": [], "dining": [], "business": [], "leisure": [],
+        "services": [], "transportation": [], "other": []
+    }
+    for facility in facilities:
+        facility_lower = facility.lower()
+        if any(keyword in facility_lower for keyword in ["wifi", "wlan", "internet", "wireless"]):
+            categories["connectivity"].append(facility)
+        elif any(keyword in facility_lower for keyword in ["restaurant", "bar", "cafe", "dining", "breakfast", "room service"]):
+            categories["dining"].append(facility)
+        elif any(keyword in facility_lower for keyword in ["conference", "meeting", "business", "boardroom"]):
+            categories["business"].append(facility)
+        elif any(keyword in facility_lower for keyword in ["pool", "gym", "spa", "fitness", "casino", "games", "theatre", "nightclub"]):
+            categories["leisure"].append(facility)
+        elif any(keyword in facility_lower for keyword in ["laundry", "concierge", "reception", "room service", "housekeeping", "medical"]):
+            categories["services"].append(facility)
+        elif any(keyword in facility_lower for keyword in ["parking", "car park", "garage", "valet"]):
+            categories["transportation"].append(facility)
+        else:
+            categories["other"].append(facility)
+    return {k: v for k, v in categories.items() if v}
+
+
+def build_static_content_page(hotel_count: int = 1000):
+    """Build a static content page of hotels with 15-40 facilities each"""
+    rng = random.Random(42)
+    return [
+        rng.sample(FACILITY_VOCABULARY, rng.randint(15, 40))
+        for _ in range(hotel_count)
+    ]
+
+
+def bench(label, func, page, rounds=5):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for facilities in page:
+            func(facilities)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<12} {best * 1000:8.2f} ms per {len(page)}-hotel page")
+    return best
+
+
+if __name__ == "__main__":
+    page = build_static_content_page()
+
+    for facilities in page:
+        assert hotel_api_service._categorize_facilities(facilities) == legacy_categorize_facilities(facilities)
+
+    legacy = bench("legacy", legacy_categorize_facilities, page)
+    current = bench("precompiled", hotel_api_service._categorize_facilities, page)
+    print(f"speedup      {legacy / current:8.2f}x")
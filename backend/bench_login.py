@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import asyncio
+import hashlib
+import secrets
+import time
+
+from app.services.passwords import PasswordHasher, PasswordHasherBusyError
+
+PASSWORD = "correct horse battery staple"
+
+
+def legacy_hash(password: str) -> str:
+    """The salted SHA-256 format stored before the KDF switch"""
+    salt = secrets.token_hex(32)
+    return f"{salt}:{hashlib.sha256((password + salt).encode()).hexdigest()}"
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01):
+    """Worst delay of a 10 ms ticker while the storm runs"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def storm(label, verify, logins):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_loop_lag(stop))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(verify() for _ in range(logins)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag
+
+    rejected = sum(isinstance(result, PasswordHasherBusyError) for result in results)
+    errors = [result for result in results if isinstance(result, Exception) and not isinstance(result, PasswordHasherBusyError)]
+    assert not errors, errors
+    served = logins - rejected
+    print(
+        f"{label:<18} {served / elapsed:8.1f} logins/s  "
+        f"loop lag {worst_lag * 1000:8.1f} ms  rejected {rejected}"
+    )
+
+
+async def main(logins: int = 200):
+    hasher = PasswordHasher(max_pending=logins)
+    stored = await hasher.hash(PASSWORD)
+
+    valid, new_hash = await hasher.verify(PASSWORD, stored)
+    assert valid and new_hash is None
+
+    async def inline():
+        # What login did before: the KDF running on the event loop
+        return hasher._verify_and_update(PASSWORD, stored)
+
+    await storm("kdf on event loop", inline, logins)
+    await storm("kdf in thread pool", lambda: hasher.verify(PASSWORD, stored), logins)
+
+    # A bounded queue sheds the excess instead of queueing it
+    bounded = PasswordHasher(workers=4, max_pending=16)
+    await storm("bounded (4 + 16)", lambda: bounded.verify(PASSWORD, stored), logins)
+
+    valid, new_hash = await hasher.verify(PASSWORD, legacy_hash(PASSWORD))
+    assert valid and new_hash is not None
+    assert (await hasher.verify(PASSWORD, new_hash)) == (True, None)
+    print("legacy hash verified and rehashed")
+
+    hasher.shutdown()
+    bounded.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
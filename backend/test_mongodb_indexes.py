@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+
+from app.config import settings
+from app.mongodb_indexes import DOCUMENT_MODELS, ensure_unique_indexes, find_missing_indexes
+from app.mongodb_models import User, Booking, Payment
+from app.models.wallet import Wallet, Transaction, RewardItem
+from app.models.referral import ReferralCode, Referral, ReferralEarning, UserReferralStats
+from app.models.franchise import FranchisePartner, FranchiseBooking, FranchiseCommission
+from app.models.outbox import OutboxEvent, AppliedEvent
+
+# (model, filter, sort) for every hot query in the routers and services
+HOT_QUERIES = [
+    (User, {"uid": "uid-1"}, None),
+    (User, {"email": "user@example.com"}, None),
+    (Booking, {"user_id": "u1"}, [("created_at", -1)]),
+    (Payment, {"booking_id": "b1"}, None),
+    (Payment, {"stripe_payment_intent_id": {"$in": ["pi_1", "pi_2"], "$type": "string"}}, None),
+    (Wallet, {"user_id": "u1"}, None),
+    (Transaction, {"user_id": "u1"}, [("created_at", -1), ("_id", -1)]),
+    (Transaction, {"user_id": "u1", "type": "deposit"}, [("created_at", -1), ("_id", -1)]),
+    (Transaction, {"reference_id": "pi_1", "user_id": "u1", "type": "deposit", "status": "pending"}, None),
+    (RewardItem, {"is_active": True}, [("points_required", 1)]),
+    (ReferralCode, {"code": "ABCD1234"}, None),
+    (ReferralCode, {"user_id": "u1"}, None),
+    (Referral, {"referrer_id": "u1"}, [("created_at", -1)]),
+    (Referral, {"referral_code": "ABCD1234", "status": "pending"}, None),
+    (Referral, {"referred_id": "u2", "status": "registered"}, None),
+    (ReferralEarning, {"user_id": "u1"}, [("created_at", -1), ("_id", -1)]),
+    (ReferralEarning, {"user_id": "u1", "status": "pending"}, [("created_at", -1), ("_id", -1)]),
+    (UserReferralStats, {"user_id": "u1"}, None),
+    (FranchisePartner, {"status": "active"}, [("registration_date", -1), ("_id", -1)]),
+    (FranchiseBooking, {"partner_id": "p1"}, [("booking_date", -1), ("_id", -1)]),
+    (FranchiseBooking, {}, [("booking_date", -1), ("_id", -1)]),
+    (FranchiseCommission, {"partner_id": "p1"}, [("created_at", -1), ("_id", -1)]),
+    (FranchiseCommission, {}, [("created_at", -1), ("_id", -1)]),
+    (OutboxEvent, {"idempotency_key": "referral.booked:r1"}, None),
+    (OutboxEvent, {"status": "pending"}, [("available_at", 1)]),
+    (OutboxEvent, {"lease": {"$eq": "lease-1", "$type": "string"}}, None),
+    (AppliedEvent, {"event_id": {"$in": ["e1", "e2"]}, "target": {"$in": ["wallets:user_id=u1"]}}, None),
+    (AppliedEvent, {"released": False}, [("created_at", 1)]),
+]
+
+
+def plan_stages(plan):
+    """Collect every stage name in a winning plan tree"""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+
+async def test_mongodb_indexes():
+    """Create the declared indexes in a scratch database and explain each hot query"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database_name = f"{settings.MONGODB_DATABASE}_index_test"
+    await init_beanie(database=client[database_name], document_models=DOCUMENT_MODELS)
+    await ensure_unique_indexes()
+
+    failures = []
+    try:
+        missing = await find_missing_indexes()
+        if missing:
+            failures.append(f"missing indexes: {missing}")
+
+        for model, query, sort in HOT_QUERIES:
+            cursor = model.get_motor_collection().find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+            stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+
+            label = f"{model.Settings.name} {query} sort={sort}"
+            if "COLLSCAN" in stages or "IXSCAN" not in stages:
+                failures.append(f"{label}: {stages}")
+                print(f"FAIL {label}: {stages}")
+            else:
+                print(f"ok   {label}")
+    finally:
+        await client.drop_database(database_name)
+
+    assert not failures, "\n".join(failures)
+    print(f"\nAll {len(HOT_QUERIES)} hot queries use an index")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_mongodb_indexes())
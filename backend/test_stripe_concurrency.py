@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import stripe
+
+from app.payment import PaymentService
+
+# Simulated Stripe API round trip
+STRIPE_LATENCY = 0.2
+DEPOSITS = 20
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """Answers PaymentIntent create/retrieve like the Stripe API, slowly"""
+
+    def _reply(self, body):
+        time.sleep(STRIPE_LATENCY)
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        self._reply({
+            "id": f"pi_fake_{next(self.server.intent_ids)}",
+            "object": "payment_intent",
+            "amount": int(form["amount"][0]),
+            "currency": form["currency"][0],
+            "status": "requires_payment_method",
+            "client_secret": "pi_fake_secret"
+        })
+
+    def do_GET(self):
+        self._reply({
+            "id": self.path.rsplit("/", 1)[-1],
+            "object": "payment_intent",
+            "status": "succeeded"
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_stripe():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripeHandler)
+    server.intent_ids = itertools.count(1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def measure(label, create):
+    start = time.perf_counter()
+    intents = await asyncio.gather(*(create(50.0 + i) for i in range(DEPOSITS)))
+    elapsed = time.perf_counter() - start
+    assert len({intent.id for intent in intents}) == DEPOSITS
+    print(f"{label:<10} {DEPOSITS / elapsed:6.1f} deposits/s ({elapsed:.2f}s for {DEPOSITS})")
+    return elapsed
+
+
+async def test_stripe_concurrency():
+    """Concurrent deposits overlap their Stripe calls instead of running one at a time"""
+    server = start_fake_stripe()
+    stripe.api_key = "sk_test_fake"
+    stripe.api_base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    service = PaymentService(max_concurrency=10)
+    try:
+        async def blocking_create(amount):
+            # What create_payment_intent did before: the SDK call on the event loop
+            return stripe.PaymentIntent.create(amount=int(amount * 100), currency="usd")
+
+        serialized = await measure("blocking", blocking_create)
+        concurrent = await measure("executor", service.create_payment_intent)
+
+        intent = await service.confirm_payment_intent("pi_fake_1")
+        assert intent.status == "succeeded"
+    finally:
+        service.shutdown()
+        server.shutdown()
+
+    assert serialized >= DEPOSITS * STRIPE_LATENCY
+    assert concurrent < serialized / 4, "Stripe calls are still serialized"
+    print(f"speedup    {serialized / concurrent:6.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_stripe_concurrency())
@@ -80,8 +80,8 @@ export default function FranchisePage() {
       });
 
       if (partnersResponse.ok) {
-        const partners = await partnersResponse.json();
-        setFranchisePartners(partners);
+        const partnersPage = await partnersResponse.json();
+        setFranchisePartners(partnersPage.partners || []);
       }
 
       // Fetch analytics data